@@ -5,7 +5,7 @@ import logging
 import os
 
 from message_serializer.directory import Directory
-from message_serializer.code_generators import pythonGenerator, CppGenerator
+from message_serializer.code_generators import pythonGenerator, CppGenerator, CtypesGenerator
 
 # Define command line arguments
 arguments = [
@@ -28,9 +28,26 @@ arguments = [
         "name": "-L",
         "metavar": "--lang",
         "help": "Language for generated code",
-        "choices": ["cpp", "python", "json"],
+        "choices": ["cpp", "python", "ctypes", "json"],
         "default": "cpp",
     },
+    {
+        "name": "-B",
+        "metavar": "--backend",
+        "help": "Serialization backend for generated python code",
+        "choices": pythonGenerator.BACKENDS,
+        "default": pythonGenerator.STRUCT,
+    },
+    {
+        "name": "--no-slots",
+        "help": "Generate python messages with a per instance __dict__ instead of __slots__, so extra attributes can be attached",
+        "action": "store_true",
+    },
+    {
+        "name": "--lite",
+        "help": "Generate python code that only imports the standard library (numpy is loaded lazily by the batch APIs)",
+        "action": "store_true",
+    },
 ]
 
 parser = argparse.ArgumentParser(
@@ -47,6 +64,12 @@ for arg in arguments:
             default=arg["default"],
             metavar=arg["metavar"],
         )
+    elif "action" in arg:
+        parser.add_argument(
+            arg["name"],
+            help=arg["help"],
+            action=arg["action"],
+        )
     else:
         parser.add_argument(
             arg["name"],
@@ -104,6 +127,9 @@ if __name__ == "__main__":
         f"\t\tOutput directory: {args.D}\n"
         f"\t\tOutput file: {args.O}\n"
         f"\t\tLanguage: {args.L}\n"
+        f"\t\tPython backend: {args.B}\n"
+        f"\t\tPython slots: {not args.no_slots}\n"
+        f"\t\tPython lite: {args.lite}\n"
     )
 
     # sys.tracebacklimit = 0
@@ -127,11 +153,16 @@ if __name__ == "__main__":
     code_generators = {
         "cpp": CppGenerator,
         "python": pythonGenerator,
+        "ctypes": CtypesGenerator,
+    }
+
+    generator_options = {
+        "python": {"backend": args.B, "slots": not args.no_slots, "lite": args.lite},
     }
 
     if args.L not in code_generators.keys():
         print(f"Language {args.L} not supported")
         sys.exit(1)
 
-    codeGen = code_generators[args.L](tree)
+    codeGen = code_generators[args.L](tree, **generator_options.get(args.L, {}))
     codeGen.generate_source_files(args.D, args.O)
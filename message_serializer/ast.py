@@ -198,6 +198,25 @@ class ast:
                 return childSearch
         return self.find_member_reference(searchName, parent)
 
+    def resolve_count(self, value):
+        """Follows constant and state references until a numeric literal is reached"""
+        if isinstance(value, dict):
+            if self.get_type(value) == STATEFIELD:
+                return self.__resolve_state_field(value)
+            return self.resolve_count(value["default_value"])
+        return int(value)
+
+    def __resolve_state_field(self, stateField):
+        # states count up from the previous value unless explicitly assigned, like C++ enums
+        value = -1
+        for field in stateField["parent"]["fields"]:
+            if field["default_value"] is not None:
+                value = self.resolve_count(field["default_value"])
+            else:
+                value += 1
+            if field is stateField:
+                return value
+
     def element_file_name(self, element):
         if "filename" in element:
             return element["filename"]
@@ -214,7 +233,8 @@ class ast:
         for element in self.__depth_first_iterator():
             if "parent" in element.keys():
                 del element["parent"]
-        return json.dump(self.__print_order, outFile)
+        # type limits are numpy scalars, which json can't serialize on its own
+        return json.dump(self.__print_order, outFile, default=lambda value: value.item())
 
     def __depth_first_iterator(self):
         nodeList = [node for node in self.tree["modules"]]
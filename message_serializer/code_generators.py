@@ -1,2 +1,3 @@
 from message_serializer.generator_python import *
-from message_serializer.generator_cpp import *
\ No newline at end of file
+from message_serializer.generator_cpp import *
+from message_serializer.generator_ctypes import *
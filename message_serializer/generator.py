@@ -116,7 +116,7 @@ class Generator(ABC):
 
     def get_language_type(self, element):
         e_type = self.ast_tree.get_type(element)
-        if e_type not in BUILTINS.keys():
+        if e_type not in BUILTINS.keys() and e_type not in self.type_lookup:
             return self.msg_name_w_scope(element["type"])
         return self.type_lookup[e_type]
 
@@ -129,9 +129,45 @@ class Generator(ABC):
 
         return None
 
+    def get_field_offsets(self, message):
+        """Returns the wire byte offset of every top level field of message, followed by the message size"""
+        offsets = [0]
+        for field in message["fields"]:
+            offsets.append(offsets[-1] + self.get_field_size(field))
+        return offsets
+
+    def get_field_size(self, field):
+        e_type = self.ast_tree.get_type(field)
+        if e_type == BF:
+            return (int(field["count"]) + 7) // 8
+        count = self.ast_tree.resolve_count(field["count"]) if "count" in field else 1
+        if e_type in BUILTINS.keys():
+            return count * field["type"][BITLENGTH] // 8
+        return count * self.get_field_offsets(field["type"])[-1]
+
     def get_count(self, element):
         if "count" not in element:
             return "1"
         if is_number(element["count"]):
             return element["count"]
         return self.msg_name_w_scope(element["count"])
+
+    def is_array(self, field):
+        # a count given by reference is always an array, even if it resolves to 1
+        count = self.get_count(field)
+        return not is_number(count) or int(count) > 1
+
+    def uses_bitfields(self):
+        for message in self.ast_tree.message_iterator():
+            for field in message["fields"]:
+                if self.ast_tree.get_type(field) == BF:
+                    return True
+        return False
+
+    def contains_bitfields(self, message):
+        # true when the message or any message nested in it has a bitfield group
+        for field in message["fields"]:
+            e_type = self.ast_tree.get_type(field)
+            if e_type == BF or (e_type not in BUILTINS.keys() and self.contains_bitfields(field["type"])):
+                return True
+        return False
@@ -48,6 +48,7 @@ class CppGenerator(Generator):
         wordIDs = self._generate_wordIDList() + "\n"
         max_size_constant = self._get_max_message_size()
         message_generator = f"{self.tab()}serializableMessage *newMessage(wordIDs id);\n";
+        frame_helpers = self._generate_frame_declarations()
         self.dedent()
 
         headerFile = (
@@ -59,6 +60,7 @@ class CppGenerator(Generator):
             + modules
             + max_size_constant
             + message_generator
+            + frame_helpers
             + f"}} // namespace {source_name.upper()}\n\n"
             + f"#endif\t//_{source_name.upper()}_H_\n\n"
         )
@@ -76,9 +78,21 @@ class CppGenerator(Generator):
                 + self._generate_message_deserialization(message)
                 + "\n"
             )
+            # C++14 needs an out of line definition for the odr-used FIELD_OFFSETS,
+            # C++17 made it redundant (but still valid) as static constexpr members are inline
+            serializers += (
+                f"{self.tab()}constexpr uint16_t {source_name.upper()}::{module['name']}::"
+                + f"{message['name']}::FIELD_OFFSETS[];\n\n"
+            )
 
         impl_includes = f'#include "{source_name}.h"\n\n'
-        implementationFile = lic + impl_includes + self._generate_message_generator_func(source_name.upper()) + serializers
+        implementationFile = (
+            lic
+            + impl_includes
+            + self._generate_message_generator_func(source_name.upper())
+            + self._generate_frame_helpers(source_name.upper())
+            + serializers
+        )
 
         return headerFile, implementationFile
 
@@ -174,6 +188,11 @@ class CppGenerator(Generator):
             on_udf=on_udf_lambda,
         )
         line += "0;\n"
+        # byte offset of every top level field in the wire format, then SIZE, for delta encoding.
+        # Defined out of line in the .cpp as well, so the output builds with C++14 and later.
+        offsets = self.get_field_offsets(message)
+        line += f"{self.tab()}static constexpr int FIELD_COUNT = {len(offsets) - 1};\n"
+        line += f"{self.tab()}static constexpr uint16_t FIELD_OFFSETS[FIELD_COUNT + 1] = {{{', '.join(str(offset) for offset in offsets)}}};\n"
 
         # serialization
         line += f"{self.tab()}int serialize(uint8_t *buffer) override;\n"
@@ -294,7 +313,7 @@ class CppGenerator(Generator):
             if count == 1:
                 line += f"{self.tab()}{hton_call}(&{field['name']}, itr, sizeof({field['name']}));\n"
             else:
-                line += f"{self.tab()}{hton_call}({field['name']}, itr, sizeof({field['name']}[0]));\n"
+                line += f"{self.tab()}{hton_call}(&{field['name']}[i], itr, sizeof({field['name']}[0]));\n"
         else:
             line += self.tab() + f"itr += {field['name']}"
             if count != 1:
@@ -394,4 +413,43 @@ class CppGenerator(Generator):
         line += f"{self.tab()}return nullptr;\n"
         self.dedent();
         line += f"{self.tab()}}}\n\n";
-        return line
\ No newline at end of file
+        return line
+
+    def _generate_frame_declarations(self):
+        # dense size table indexed by word ID, so framing and decoding never search
+        line = f"\n{self.tab()}constexpr uint16_t MESSAGE_SIZES[(int)wordIDs::WORDID_COUNT] = {{\n"
+        self.indent()
+        for message in self.ast_tree.message_iterator():
+            line += f"{self.tab()}{self.msg_name_w_scope(message)}::SIZE,\n"
+        self.dedent()
+        line += f"{self.tab()}}};\n\n"
+        line += f"{self.tab()}int encodeFrame(serializableMessage &msg, uint8_t *buffer);\n"
+        line += f"{self.tab()}serializableMessage *decodeAny(uint8_t *buffer, int *consumed);\n"
+        return line
+
+    def _generate_frame_helpers(self, source_name):
+        line = f"{self.tab()}int {source_name}::encodeFrame(serializableMessage &msg, uint8_t *buffer)\n{self.tab()}{{\n"
+        self.indent()
+        line += f"{self.tab()}uint8_t* itr = buffer;\n"
+        line += f"{self.tab()}itr += serializer::writeFrameHeader(msg.WORD_ID, MESSAGE_SIZES[msg.WORD_ID], itr);\n"
+        line += f"{self.tab()}itr += msg.serialize(itr);\n"
+        line += f"{self.tab()}return itr - buffer;\n"
+        self.dedent()
+        line += f"{self.tab()}}}\n\n"
+
+        line += f"{self.tab()}serializableMessage *{source_name}::decodeAny(uint8_t *buffer, int *consumed)\n{self.tab()}{{\n"
+        self.indent()
+        line += f"{self.tab()}uint16_t id, length;\n"
+        line += f"{self.tab()}uint8_t* itr = buffer + serializer::readFrameHeader(buffer, &id, &length);\n"
+        line += f"{self.tab()}if (id >= (uint16_t)wordIDs::WORDID_COUNT || length != MESSAGE_SIZES[id]) {{\n"
+        self.indent()
+        line += f"{self.tab()}return nullptr;\n"
+        self.dedent()
+        line += f"{self.tab()}}}\n"
+        line += f"{self.tab()}serializableMessage *msg = newMessage((wordIDs)id);\n"
+        line += f"{self.tab()}itr += msg->deserialize(itr);\n"
+        line += f"{self.tab()}*consumed = itr - buffer;\n"
+        line += f"{self.tab()}return msg;\n"
+        self.dedent()
+        line += f"{self.tab()}}}\n\n"
+        return line
@@ -0,0 +1,251 @@
+from message_serializer.generator import logger
+from message_serializer.generator_cpp import CppGenerator
+from message_serializer.generator_python import pythonGenerator
+from message_serializer.cpp_config import *
+import os
+
+
+class CtypesGenerator(CppGenerator):
+    """Generates the C++ serializers together with an extern "C" shim and a python
+    module that loads them through ctypes. The shim has a batch encode and decode
+    entry point per word ID, which convert between wire bytes and native byte order
+    records with the layout of the python DTYPEs, so whole buffers are converted
+    into NumPy arrays in one native call."""
+
+    SHIM_SUFFIX = "_c"
+    MODULE_SUFFIX = "_native"
+
+    def generate_source_files(self, output_dir, source_name=None):
+        if source_name is None:
+            source_name = self.NAME
+        super().generate_source_files(output_dir, source_name)
+
+        messages = self.ast_tree.message_iterator()
+        unsupported = [self.msg_name_w_scope(message) for message in messages if not self._is_supported(message)]
+        if unsupported:
+            logger.warning(f"Messages with bitfields get no ctypes bindings: {', '.join(unsupported)}")
+
+        logger.info(f"Generating ctypes bindings...")
+        with open(f"{output_dir}/{source_name}{self.SHIM_SUFFIX}.cpp", "w") as f:
+            f.write(self.generate_shim(source_name))
+        with open(f"{output_dir}/{source_name}{self.MODULE_SUFFIX}.py", "w") as f:
+            f.write(self.generate_module(source_name))
+        logger.debug(f"Generated {output_dir}/{source_name}{self.MODULE_SUFFIX}.py")
+
+    """
+    ===============================================================================
+                                    C SHIM
+    ===============================================================================
+    """
+
+    def generate_shim(self, source_name):
+        namespace = source_name.upper()
+        line = self.get_license() + "\n"
+        line += f'#include "{source_name}.h"\n\n#include <string.h>\n\n'
+
+        # native records: every field in wire order, in native byte order, without padding
+        line += "namespace {\n\n"
+        self.indent()
+        for message in self._supported_messages():
+            line += self._generate_native_copy(message, namespace, store=True)
+            line += self._generate_native_copy(message, namespace, store=False)
+        self.dedent()
+        line += "} // namespace\n\n"
+
+        line += 'extern "C" {\n\n'
+        self.indent()
+        for message in self._supported_messages():
+            line += self._generate_batch_function(message, namespace, source_name, decode=True)
+            line += self._generate_batch_function(message, namespace, source_name, decode=False)
+        self.dedent()
+        line += '} // extern "C"\n'
+        return line
+
+    def _generate_native_copy(self, message, namespace, store=True):
+        name = f"{namespace}::{self.msg_name_w_scope(message)}"
+        if store:
+            line = f"{self.tab()}int storeNative({name} &msg, uint8_t *buffer)\n{self.tab()}{{\n"
+        else:
+            line = f"{self.tab()}int loadNative({name} &msg, const uint8_t *buffer)\n{self.tab()}{{\n"
+        self.indent()
+        line += f"{self.tab()}{'uint8_t' if store else 'const uint8_t'} *itr = buffer;\n"
+        line += self._message_field_worker(
+            message=message,
+            on_udf=lambda field, *args: self._native_copy_message(field, store),
+            on_df=lambda field, *args: self._native_copy_builtin(field, store),
+        )
+        line += f"{self.tab()}return itr - buffer;\n"
+        self.dedent()
+        line += f"{self.tab()}}}\n\n"
+        return line
+
+    def _native_copy_builtin(self, field, store):
+        # arrays are contiguous in the struct, so they copy like single values
+        member = f"msg.{field['name']}"
+        address = member if self.is_array(field) else f"&{member}"
+        if store:
+            line = f"{self.tab()}memcpy(itr, {address}, sizeof({member}));\n"
+        else:
+            line = f"{self.tab()}memcpy({address}, itr, sizeof({member}));\n"
+        return line + f"{self.tab()}itr += sizeof({member});\n"
+
+    def _native_copy_message(self, field, store):
+        function = "storeNative" if store else "loadNative"
+        member = f"msg.{field['name']}"
+        if not self.is_array(field):
+            return f"{self.tab()}itr += {function}({member}, itr);\n"
+        line = f"{self.tab()}for (unsigned int i = 0; i < sizeof({member}) / sizeof({member}[0]); i++) {{\n"
+        self.indent()
+        line += f"{self.tab()}itr += {function}({member}[i], itr);\n"
+        self.dedent()
+        return line + f"{self.tab()}}}\n"
+
+    def _generate_batch_function(self, message, namespace, source_name, decode=True):
+        name = f"{namespace}::{self.msg_name_w_scope(message)}"
+        function = self._batch_function_name(message, source_name, decode)
+        if decode:
+            line = f"{self.tab()}int {function}(uint8_t *wire, int count, uint8_t *records)\n{self.tab()}{{\n"
+        else:
+            line = f"{self.tab()}int {function}(const uint8_t *records, int count, uint8_t *wire)\n{self.tab()}{{\n"
+        self.indent()
+        line += f"{self.tab()}{name} msg;\n"
+        line += f"{self.tab()}for (int i = 0; i < count; i++) {{\n"
+        self.indent()
+        if decode:
+            line += f"{self.tab()}msg.deserialize(wire + i * {name}::SIZE);\n"
+            line += f"{self.tab()}storeNative(msg, records + i * {name}::SIZE);\n"
+        else:
+            line += f"{self.tab()}loadNative(msg, records + i * {name}::SIZE);\n"
+            line += f"{self.tab()}msg.serialize(wire + i * {name}::SIZE);\n"
+        self.dedent()
+        line += f"{self.tab()}}}\n"
+        line += f"{self.tab()}return count;\n"
+        self.dedent()
+        line += f"{self.tab()}}}\n\n"
+        return line
+
+    def _batch_function_name(self, message, source_name, decode=True):
+        if not self._is_supported(message):
+            return None
+        return f"{source_name}_{'decode' if decode else 'encode'}_{self.msg_2_wordID(message)}"
+
+    def _is_supported(self, message):
+        # the C++ serializers don't write bitfield groups, so those messages can't be converted
+        return not self.contains_bitfields(message)
+
+    def _supported_messages(self):
+        return [message for message in self.ast_tree.message_iterator() if self._is_supported(message)]
+
+    """
+    ===============================================================================
+                                    PYTHON MODULE
+    ===============================================================================
+    """
+
+    def generate_module(self, source_name):
+        # the python generator already knows the word IDs and dtypes
+        python = pythonGenerator(self.ast_tree)
+        messages = list(self.ast_tree.message_iterator())
+        sources = [f"{source_name}.cpp", f"{source_name}{self.SHIM_SUFFIX}.cpp", "serializer/serializer.cpp"]
+
+        line = python.get_license()
+        line += "import ctypes\nimport os\nimport subprocess\n\nimport numpy as np\n\n\n"
+        line += python._generate_message_id_list() + "\n"
+        line += "DIRECTORY = os.path.dirname(os.path.abspath(__file__))\n"
+        line += f'LIBRARY = os.path.join(DIRECTORY, "lib{source_name}.so")\n'
+        line += f"SOURCES = {sources}\n\n"
+
+        line += "# native byte order records, indexed by word ID. The fields and layout match the\n"
+        line += "# DTYPE of the generated python messages. Messages with bitfields have no bindings.\n"
+        line += "DTYPES = [\n"
+        python.indent()
+        for message in messages:
+            if not self._is_supported(message):
+                line += f"{python.tab()}None,\n"
+                continue
+            line += f"{python.tab()}np.dtype(\n"
+            python.indent()
+            line += f"{python.tab()}[\n"
+            python.indent()
+            for member in python._dtype_members(message):
+                line += f"{python.tab()}{member},\n"
+            python.dedent()
+            line += f"{python.tab()}]\n"
+            python.dedent()
+            line += f'{python.tab()}).newbyteorder("="),\n'
+        python.dedent()
+        line += "]\n"
+        line += f"SIZES = {[python._message_size(message) for message in messages]}\n"
+        line += f"DECODERS = {[self._batch_function_name(message, source_name, True) for message in messages]}\n"
+        line += f"ENCODERS = {[self._batch_function_name(message, source_name, False) for message in messages]}\n"
+        line += self._module_functions()
+        return line
+
+    def _module_functions(self):
+        return '''
+
+def build(compiler="g++", flags=("-O2",)):
+    """Compiles the generated C++ sources into LIBRARY."""
+    command = [compiler, *flags, "-std=c++17", "-shared", "-fPIC", "-o", LIBRARY]
+    command += [os.path.join(DIRECTORY, source) for source in SOURCES]
+    subprocess.run(command, check=True)
+
+
+_library = None
+_decoders = []
+_encoders = []
+
+
+def load() -> ctypes.CDLL:
+    """Returns the shared library, building it first when it is missing or older
+    than its sources."""
+    global _library
+    if _library is None:
+        built = os.path.getmtime(LIBRARY) if os.path.exists(LIBRARY) else -1
+        if any(os.path.getmtime(os.path.join(DIRECTORY, source)) > built for source in SOURCES):
+            build()
+        library = ctypes.CDLL(LIBRARY)
+        for names, functions in ((DECODERS, _decoders), (ENCODERS, _encoders)):
+            for name in names:
+                function = None
+                if name is not None:
+                    function = getattr(library, name)
+                    function.argtypes = [ctypes.c_void_p, ctypes.c_int, ctypes.c_void_p]
+                    function.restype = ctypes.c_int
+                functions.append(function)
+        _library = library
+    return _library
+
+
+def _function(names, functions, word_id):
+    # checked before load() so unsupported messages fail without building the library
+    if names[word_id] is None:
+        raise ValueError(f"Word ID {word_id} has bitfields, which the ctypes bindings don't support")
+    load()
+    return functions[word_id]
+
+
+def decode(word_id: int, buffer, count=-1, offset=0) -> np.recarray:
+    """Decodes count messages of word_id written back to back in buffer (all of
+    them by default) with the C++ deserializers, in one native call. Returns a
+    record array in native byte order. Raises ValueError for messages with bitfields."""
+    function = _function(DECODERS, _decoders, word_id)
+    size = SIZES[word_id]
+    if count < 0:
+        count = (memoryview(buffer).nbytes - offset) // size
+    wire = np.frombuffer(buffer, dtype=np.uint8, count=count * size, offset=offset)
+    records = np.empty(count, dtype=DTYPES[word_id])
+    function(wire.ctypes.data, count, records.ctypes.data)
+    return records.view(np.recarray)
+
+
+def encode(word_id: int, records) -> bytes:
+    """Encodes a record array of word_id's DTYPE with the C++ serializers, in one
+    native call, and returns the messages' wire bytes back to back. Raises
+    ValueError for messages with bitfields."""
+    function = _function(ENCODERS, _encoders, word_id)
+    records = np.ascontiguousarray(records, dtype=DTYPES[word_id])
+    wire = np.empty(len(records) * SIZES[word_id], dtype=np.uint8)
+    function(records.ctypes.data, len(records), wire.ctypes.data)
+    return wire.tobytes()
+'''
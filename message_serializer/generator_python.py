@@ -4,14 +4,30 @@ from message_serializer.python_config import *
 from message_serializer.parser import is_number
 
 import os
+import struct
 
 
 class pythonGenerator(Generator):
     # common variable names
     bStrVName = "bStr"
     bfBstrVName = "bfBstr"
-
-    def __init__(self, tree: ast):
+    valuesVName = "values"
+
+    # serialization backends
+    STRUCT = "struct"
+    BITSTREAM = "bitstream"
+    BACKENDS = [STRUCT, BITSTREAM]
+
+    def __init__(self, tree: ast, backend=STRUCT, slots=True, lite=False):
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Unknown python backend '{backend}'")
+        if lite and backend != self.STRUCT:
+            raise ValueError(f"Lite python output requires the '{self.STRUCT}' backend")
+        self.backend = backend
+        # lite modules import only the standard library, numpy is loaded on first batch API use
+        self.lite = lite
+        # messages use __slots__ unless users need to attach their own attributes
+        self.slots = slots
         self.inlineCommentChar = "#"
         super().__init__(
             tree,
@@ -25,15 +41,39 @@ class pythonGenerator(Generator):
         imports = [
             "import numpy as np",
             "from typing import List",
-            "from bitstring import BitArray, BitStream",
-            "from serializer.serializer import serializableMessage",
         ]
+        if self.lite:
+            imports.remove("import numpy as np")
+        if self.backend == self.STRUCT:
+            imports = ["import array", "import struct"] + imports
+        serializer_imports = ["serializableMessage", "messageRegistry", "messageView"]
+        serializer_imports += ["scalarAccessor", "arrayAccessor", "messageAccessor", "messageArrayAccessor"]
+        if self.backend == self.BITSTREAM:
+            imports.append("from bitstring import BitArray, BitStream")
+        else:
+            if self.uses_bitfields():
+                serializer_imports.append("BIT_REVERSE")
+            if self._uses_builtin_arrays():
+                serializer_imports += ["pack_array", "unpack_array"]
+                serializer_imports += self._array_typecode_imports()
+            if self._uses_packed_message_arrays():
+                serializer_imports.append("pack_messages")
+        if self.uses_bitfields():
+            serializer_imports.append("bitfieldAccessor")
+        if self.lite:
+            serializer_imports.append("lazyDtype")
+        if self._uses_ctypes_structures():
+            imports.insert(0, "import ctypes")
+            serializer_imports.append("bigEndianStructure")
+        imports.append(f"from serializer.serializer import {', '.join(serializer_imports)}")
         importStr = "\n".join(imports) + "\n\n\n"
 
         msgIds = self._generate_message_id_list()
         modules = self._generate_module_members()
+        maxSize = self._generate_max_message_size()
+        registry = self._generate_message_registry()
 
-        return self.get_license() + importStr + msgIds + modules
+        return self.get_license() + importStr + msgIds + modules + maxSize + registry
 
     def _generate_message(self, message):
         line = f"{self.tab()}class {message['name']}" + "(serializableMessage):\n"
@@ -45,7 +85,15 @@ class pythonGenerator(Generator):
         )
 
         for field in message["fields"]:
-            line += self._print_variable_declaration(field)
+            if self.ast_tree.get_type(field) == BF:
+                for bf_field in field["fields"]:
+                    if not bf_field.get(PADDING, False):
+                        line += self._print_variable_declaration(bf_field)
+            else:
+                line += self._print_variable_declaration(field)
+
+        if self.slots:
+            line += self._generate_message_slots(message)
 
         line += (
             "\n"
@@ -53,12 +101,48 @@ class pythonGenerator(Generator):
             + '"""########################################## SERIALIZATION ##########################################"""\n\n'
         )
 
+        line += f"{self.tab()}SIZE = {self._message_size(message)}\n"
+        line += f"{self.tab()}WORD_ID = wordIds.{self.msg_2_wordID(message)}\n"
+        # byte offset of every top level field in the wire format, then SIZE
+        line += f"{self.tab()}FIELD_OFFSETS = {tuple(self.get_field_offsets(message))}\n"
+        line += self._generate_message_dtype(message)
+        if self.backend == self.STRUCT:
+            line += self._generate_message_struct(message)
+        else:
+            line += "\n"
         line += self._generate_message_initializer(message)
-        line += self._generate_message_serialization_helper(message)
-        line += self._generate_message_deserialization_helper(message)
+        if self.backend == self.STRUCT:
+            line += self._generate_message_struct_serialization_helper(message)
+            line += self._generate_message_struct_deserialization_helper(message)
+        else:
+            line += self._generate_message_serialization_helper(message)
+            line += self._generate_message_deserialization_helper(message)
+        line += self._generate_message_validation(message)
+        line += self._generate_message_to_dict(message)
+        line += self._generate_message_from_dict(message)
         self.dedent()
+        line += self._generate_message_view(message)
+        if self._is_ctypes_compatible(message):
+            line += self._generate_message_ctypes_structure(message)
         return line
 
+    def _generate_message_slots(self, message):
+        names = "".join(f'"{name}", ' for name in self._message_attribute_names(message))
+        return f"\n{self.tab()}__slots__ = ({names})\n"
+
+    def _message_attribute_names(self, message):
+        names = []
+        for field in message["fields"]:
+            if self.ast_tree.get_type(field) == BF:
+                names += [
+                    self._field_name(bf_field)
+                    for bf_field in field["fields"]
+                    if not bf_field.get(PADDING, False)
+                ]
+            else:
+                names.append(self._field_name(field))
+        return names
+
     def _generate_message_docs(self, message):
         line = f'{self.tab()}"""\n'
         if DOC in message.keys():
@@ -86,6 +170,36 @@ class pythonGenerator(Generator):
         self.dedent()
         return line + "\n"
 
+    def _generate_max_message_size(self):
+        line = f"{self.tab()}MAX_MESSAGE_SIZE = max(\n"
+        self.indent()
+        line += f"{self.tab()}[\n"
+        self.indent()
+        for message in self.ast_tree.message_iterator():
+            line += f"{self.tab()}{self.msg_name_w_scope(message)}.SIZE,\n"
+        self.dedent()
+        line += f"{self.tab()}],\n"
+        line += f"{self.tab()}default=0,\n"
+        self.dedent()
+        line += f"{self.tab()})\n"
+        return line
+
+    def _generate_message_registry(self):
+        # listed in word ID order so the registry can index its class and size lists directly
+        line = f"\n{self.tab()}REGISTRY = messageRegistry(\n"
+        self.indent()
+        line += f"{self.tab()}[\n"
+        self.indent()
+        for message in self.ast_tree.message_iterator():
+            line += f"{self.tab()}{self.msg_name_w_scope(message)},\n"
+        self.dedent()
+        line += f"{self.tab()}]\n"
+        self.dedent()
+        line += f"{self.tab()})\n"
+        line += f"{self.tab()}encode_frame = REGISTRY.encode_frame\n"
+        line += f"{self.tab()}decode_any = REGISTRY.decode_any\n"
+        return line
+
     def _generate_enum(self, enum):
         # since there aren't enumerated values in python, we will use a class with constants and increment values as they are added like in C++
         line = f"{self.tab()}class {enum['name']}:\n"
@@ -100,7 +214,7 @@ class pythonGenerator(Generator):
     def _generate_constants(self, constant):
         dv = self.get_default_value(constant)
         e_type = self.get_language_type(constant)
-        line = f"{self.tab()}{constant['name'].upper()}: {e_type} = {dv}\n"
+        line = f"{self.tab()}{constant['name'].upper()}: '{e_type}' = {dv}\n"
         return line + "\n"
 
     def _generate_module_members(self):
@@ -112,6 +226,7 @@ class pythonGenerator(Generator):
         line = ""
         moduleName = None
         newName = None
+        openedModules = set()
 
         for element in self.ast_tree.print_order_iterator():
             e_type = self.ast_tree.get_type(element)
@@ -123,7 +238,13 @@ class pythonGenerator(Generator):
                 if moduleName is not None:
                     self.dedent()
 
-                line += f"class {newName}:\n"
+                # python classes can't be re-opened like C++ namespaces, so a module that
+                # is revisited extends its earlier definition instead of replacing it
+                if newName in openedModules:
+                    line += f"class {newName}({newName}):\n"
+                else:
+                    line += f"class {newName}:\n"
+                openedModules.add(newName)
                 self.indent()
                 moduleName = newName
             line += f"{generator(element)}\n"
@@ -135,8 +256,11 @@ class pythonGenerator(Generator):
 
     def _generate_message_deserialization_helper(self, message):
 
+        # padding members have no attribute, their bits are skipped
         deseralize_bf_members = lambda bf: "".join(
-            f"{self.tab()}self.{self._field_name(field)} = {self.bStrVName}.read('uint:{field['count']}')\n"
+            f"{self.tab()}{self.bfBstrVName}.read('pad:{field['count']}')\n"
+            if field.get(PADDING, False)
+            else f"{self.tab()}self.{self._field_name(field)} = {self.bfBstrVName}.read('uint:{field['count']}')\n"
             for field in bf["fields"]
         )
 
@@ -145,7 +269,8 @@ class pythonGenerator(Generator):
         line += f"{self.tab()}{self.bStrVName} = BitStream(bytes=byteArr)\n"
         line += self._message_field_worker(
             message,
-            on_bf_open=lambda field, *args: "",
+            # undo the per byte bit reversal serialize() applies to each group
+            on_bf_open=lambda field, *args: f"{self.tab()}{self.bfBstrVName} = BitStream(self.reverse_bits({self.bStrVName}.read({self._bitfield_byte_count(field) * 8})))\n",
             on_bf_close=lambda field, *args: "",
             on_bf=lambda field, *args: deseralize_bf_members(field),
             on_udf=lambda field, *args: self._deserialize_user_defined(field),
@@ -156,8 +281,11 @@ class pythonGenerator(Generator):
 
     def _generate_message_serialization_helper(self, message):
 
+        # padding members have no attribute, they are written as zero bits
         serialize_bf_members = lambda bf: "".join(
-            f"{self.tab()}{self.bfBstrVName}.append(BitStream(uint=self.{self._field_name(field)}, length={field['count']}))\n"
+            f"{self.tab()}{self.bfBstrVName}.append(BitStream(length={field['count']}))\n"
+            if field.get(PADDING, False)
+            else f"{self.tab()}{self.bfBstrVName}.append(BitStream(uint=self.{self._field_name(field)}, length={field['count']}))\n"
             for field in bf["fields"]
         )
 
@@ -191,9 +319,9 @@ class pythonGenerator(Generator):
         name = self._field_name(field)
         count = self.get_count(field)
         if not is_number(count) or count != 1:
-            line += f"{self.tab()}[{name}.deserialize({self.bStrVName}) for {name} in self.{name}]\n"
+            line += f"{self.tab()}[{name}.deserialize({self.bStrVName}.read({name}.SIZE * 8).bytes) for {name} in self.{name}]\n"
         else:
-            line = f"{self.tab()}self.{name}.deserialize({self.bStrVName})\n"
+            line = f"{self.tab()}self.{name}.deserialize({self.bStrVName}.read(self.{name}.SIZE * 8).bytes)\n"
         return line
 
     def _deserialize_builtin(self, field, bStrVName):
@@ -228,6 +356,459 @@ class pythonGenerator(Generator):
             line = f"{self.tab()}{bStrVName}.append(BitStream(uint=self.{name}, length={field['type'][BITLENGTH]}))\n"
         return line
 
+    """
+    ===============================================================================
+                                    VALIDATION
+    ===============================================================================
+    """
+
+    def _generate_message_validation(self, message):
+        # also called by the checked methods set_validation() swaps in for serialize()
+        line = f"{self.tab()}def validate(self) -> None:\n"
+        self.indent()
+        line += f'{self.tab()}"""Raises ValueError if a field is out of range for its wire type or an\n'
+        line += f'{self.tab()}array doesn\'t have its declared length."""\n'
+        for field in message["fields"]:
+            e_type = self.ast_tree.get_type(field)
+            if e_type == BF:
+                for bf_field, _, mask in self._bitfield_shifts(field):
+                    line += self._range_check(message, bf_field, 0, mask, array=False)
+            elif e_type in BUILTINS.keys():
+                bounds = BUILTINS[e_type]
+                cast = float if e_type in (F32, F64) else int
+                line += self._range_check(
+                    message, field, cast(bounds["min"]), cast(bounds["max"]), self.is_array(field)
+                )
+            elif self.is_array(field):
+                line += self._length_check(message, field)
+                line += f"{self.tab()}for item in self.{self._field_name(field)}:\n"
+                self.indent()
+                line += f"{self.tab()}item.validate()\n"
+                self.dedent()
+            else:
+                line += f"{self.tab()}self.{self._field_name(field)}.validate()\n"
+        self.dedent()
+        return line + "\n"
+
+    def _length_check(self, message, field):
+        name = self._field_name(field)
+        count = self.ast_tree.resolve_count(field["count"])
+        line = f"{self.tab()}if len(self.{name}) != {count}:\n"
+        self.indent()
+        line += f'{self.tab()}raise ValueError(f"{message["name"]}.{name} has {{len(self.{name})}} items, expected {count}")\n'
+        self.dedent()
+        return line
+
+    def _range_check(self, message, field, low, high, array):
+        # written as two comparisons so NaN, which every float type can hold, passes
+        name = self._field_name(field)
+        value = f"self.{name}"
+        if array:
+            line = self._length_check(message, field)
+            line += f"{self.tab()}if min({value}) < {low!r} or max({value}) > {high!r}:\n"
+        else:
+            line = f"{self.tab()}if {value} < {low!r} or {value} > {high!r}:\n"
+        self.indent()
+        line += f'{self.tab()}raise ValueError(f"{message["name"]}.{name} = {{{value}}} is out of range [{low!r}, {high!r}]")\n'
+        self.dedent()
+        return line
+
+    """
+    ===============================================================================
+                                    DICTS
+    ===============================================================================
+    """
+
+    def _dict_fields(self, message):
+        # (field, kind) in wire order with bitfield groups expanded to their named members
+        fields = []
+        for field in message["fields"]:
+            e_type = self.ast_tree.get_type(field)
+            if e_type == BF:
+                fields += [(bf_field, BF) for bf_field, _, _ in self._bitfield_shifts(field)]
+            elif e_type in BUILTINS.keys():
+                fields.append((field, "array" if self.is_array(field) else "builtin"))
+            else:
+                fields.append((field, "messages" if self.is_array(field) else "message"))
+        return fields
+
+    def _generate_message_to_dict(self, message):
+        line = f"{self.tab()}def to_dict(self) -> dict:\n"
+        self.indent()
+        line += f'{self.tab()}"""Returns the message as a dict of plain python values, nested messages\n'
+        line += f'{self.tab()}as dicts and arrays as lists."""\n'
+        line += f"{self.tab()}return {{\n"
+        self.indent()
+        for field, kind in self._dict_fields(message):
+            name = self._field_name(field)
+            value = {
+                BF: f"self.{name}",
+                "builtin": f"self.{name}",
+                "array": f"list(self.{name})",
+                "message": f"self.{name}.to_dict()",
+                "messages": f"[item.to_dict() for item in self.{name}]",
+            }[kind]
+            line += f'{self.tab()}"{name}": {value},\n'
+        self.dedent()
+        line += f"{self.tab()}}}\n"
+        self.dedent()
+        return line + "\n"
+
+    def _generate_message_from_dict(self, message):
+        line = f"{self.tab()}@classmethod\n"
+        line += f"{self.tab()}def from_dict(cls, data: dict) -> \"{message['name']}\":\n"
+        self.indent()
+        line += f'{self.tab()}"""Builds a message from a dict in the format of to_dict(). Every field\n'
+        line += f'{self.tab()}must be present."""\n'
+        line += f"{self.tab()}msg = cls()\n"
+        for field, kind in self._dict_fields(message):
+            name = self._field_name(field)
+            if kind == "array" and self.backend == self.STRUCT:
+                typecode = BUILTIN_TO_ARRAY[self.ast_tree.get_type(field)]
+                value = f'array.array({typecode}, data["{name}"])'
+            elif kind == "array":
+                value = f'list(data["{name}"])'
+            elif kind == "message":
+                value = f'{self.get_language_type(field)}.from_dict(data["{name}"])'
+            elif kind == "messages":
+                value = f'[{self.get_language_type(field)}.from_dict(item) for item in data["{name}"]]'
+            else:
+                value = f'data["{name}"]'
+            line += f"{self.tab()}msg.{name} = {value}\n"
+        line += f"{self.tab()}return msg\n"
+        self.dedent()
+        return line + "\n"
+
+    """
+    ===============================================================================
+                                    NUMPY
+    ===============================================================================
+    """
+
+    def _generate_message_dtype(self, message):
+        # nested messages are written out in full so the dtype doesn't depend on
+        # another module's class having finished executing
+        dtype = "lazyDtype" if self.lite else "np.dtype"
+        line = f"{self.tab()}DTYPE = {dtype}(\n"
+        self.indent()
+        line += f"{self.tab()}[\n"
+        self.indent()
+        for member in self._dtype_members(message):
+            line += f"{self.tab()}{member},\n"
+        self.dedent()
+        line += f"{self.tab()}]\n"
+        self.dedent()
+        line += f"{self.tab()})\n"
+        return line
+
+    def _dtype_members(self, message):
+        members = []
+        for field in message["fields"]:
+            name = self._field_name(field)
+            e_type = self.ast_tree.get_type(field)
+            if e_type == BF:
+                # sub-byte members can't be expressed in a dtype, keep the group's raw bytes
+                members.append(f'("{name}", ">u1", ({self._bitfield_byte_count(field)},))')
+                continue
+            if e_type in BUILTINS.keys():
+                dtype = f'"{BUILTIN_TO_DTYPE[e_type]}"'
+            else:
+                dtype = f"[{', '.join(self._dtype_members(field['type']))}]"
+            if self.is_array(field):
+                members.append(f'("{name}", {dtype}, ({self.ast_tree.resolve_count(field["count"])},))')
+            else:
+                members.append(f'("{name}", {dtype})')
+        return members
+
+    """
+    ===============================================================================
+                                    VIEWS
+    ===============================================================================
+    """
+
+    def _generate_message_view(self, message):
+        # emitted in the same class body as its message, which links the two once both exist
+        name = f"{message['name']}View"
+        line = f"\n{self.tab()}class {name}(messageView):\n"
+        self.indent()
+        line += f'{self.tab()}"""Read only view of a {message["name"]} inside a buffer. Fields are decoded\n'
+        line += f'{self.tab()}from their fixed byte offsets each time they are read."""\n\n'
+        line += f"{self.tab()}__slots__ = ()\n"
+        line += f"{self.tab()}SIZE = {self._message_size(message)}\n\n"
+        for field, offset in zip(message["fields"], self.get_field_offsets(message)):
+            line += self._generate_view_accessor(field, offset)
+        self.dedent()
+        line += f"\n{self.tab()}{name}.MESSAGE = {message['name']}\n"
+        line += f"{self.tab()}{message['name']}.VIEW = {name}\n"
+        return line
+
+    def _generate_view_accessor(self, field, offset):
+        name = self._field_name(field)
+        e_type = self.ast_tree.get_type(field)
+        if e_type == BF:
+            line = ""
+            size = self._bitfield_byte_count(field)
+            for bf_field, shift, mask in self._bitfield_shifts(field):
+                line += f"{self.tab()}{self._field_name(bf_field)} = bitfieldAccessor({offset}, {size}, {shift}, {hex(mask)})\n"
+            return line
+        if e_type in BUILTINS.keys():
+            fmt = f'">{BUILTIN_TO_STRUCT[e_type]}"'
+            if self.is_array(field):
+                return f"{self.tab()}{name} = arrayAccessor({fmt}, {offset}, {self.ast_tree.resolve_count(field['count'])})\n"
+            return f"{self.tab()}{name} = scalarAccessor({fmt}, {offset})\n"
+        # resolved on first access, the nested view may live in a module class that is still being defined
+        view = f"lambda: {self.msg_name_w_scope(field['type'])}View"
+        if self.is_array(field):
+            return f"{self.tab()}{name} = messageArrayAccessor({view}, {offset}, {self.ast_tree.resolve_count(field['count'])})\n"
+        return f"{self.tab()}{name} = messageAccessor({view}, {offset})\n"
+
+    """
+    ===============================================================================
+                                    CTYPES
+    ===============================================================================
+    """
+
+    def _generate_message_ctypes_structure(self, message):
+        # nested structures are written out in full, like the DTYPE, as the nested
+        # message's own Struct may live in a module class that is still being defined
+        name = f"{message['name']}Struct"
+        line = f"\n{self.tab()}class {name}(ctypes.BigEndianStructure):\n"
+        self.indent()
+        line += f'{self.tab()}"""Wire layout of a {message["name"]}. from_buffer() maps it over a\n'
+        line += f'{self.tab()}writable buffer, so fields are read and written in place."""\n\n'
+        line += f"{self.tab()}_pack_ = 1\n"
+        line += f"{self.tab()}_fields_ = [\n"
+        self.indent()
+        for member in self._ctypes_fields(message):
+            line += f"{self.tab()}{member},\n"
+        self.dedent()
+        line += f"{self.tab()}]\n"
+        self.dedent()
+        line += f"\n{self.tab()}{name}.MESSAGE = {message['name']}\n"
+        line += f"{self.tab()}{message['name']}.CSTRUCT = {name}\n"
+        return line
+
+    def _ctypes_fields(self, message):
+        fields = []
+        for field in message["fields"]:
+            e_type = self.ast_tree.get_type(field)
+            if e_type in BUILTINS.keys():
+                c_type = BUILTIN_TO_CTYPES[e_type]
+            else:
+                nested = field["type"]
+                c_type = f'bigEndianStructure("{nested["name"]}", [{", ".join(self._ctypes_fields(nested))}])'
+            if self.is_array(field):
+                c_type = f"{c_type} * {self.ast_tree.resolve_count(field['count'])}"
+            fields.append(f'("{self._field_name(field)}", {c_type})')
+        return fields
+
+    def _is_ctypes_compatible(self, message):
+        # ctypes bitfields can't express the wire format's bit order, so those messages get no Struct
+        return not self.contains_bitfields(message)
+
+    def _uses_ctypes_structures(self):
+        return any(self._is_ctypes_compatible(message) for message in self.ast_tree.message_iterator())
+
+    """
+    ===============================================================================
+                                    STRUCT BACKEND
+    ===============================================================================
+    """
+
+    def _struct_layout(self, message, prefix="self"):
+        # flattens a message, including nested messages, into the ordered members
+        # of a single big-endian struct so the whole message is one pack/unpack call
+        layout = []
+        for field in message["fields"]:
+            expr = f"{prefix}.{self._field_name(field)}"
+            e_type = self.ast_tree.get_type(field)
+            if e_type == BF:
+                layout.append(
+                    {
+                        "expr": f"bitfield_{len(layout)}",
+                        "format": f"{self._bitfield_byte_count(field)}s",
+                        "field": field,
+                        "prefix": prefix,
+                        "bitfield": True,
+                    }
+                )
+            elif e_type in BUILTINS.keys():
+                member = {"expr": expr, "format": BUILTIN_TO_STRUCT[e_type], "field": field}
+                if self.is_array(field):
+                    # builtin arrays travel as one raw block, converted in bulk by pack_array/unpack_array
+                    count = self.ast_tree.resolve_count(field["count"])
+                    member["format"] = f"{count * field['type'][BITLENGTH] // 8}s"
+                    member["array"] = BUILTIN_TO_ARRAY[e_type]
+                    member["count"] = count
+                layout.append(member)
+            elif self.is_array(field):
+                count = self.ast_tree.resolve_count(field["count"])
+                element = self._struct_layout(field["type"], f"{expr}[0]")
+                if count * len(element) > STRUCT_UNROLL_LIMIT:
+                    # large arrays travel as one raw block that every element packs its own slice of
+                    size = self._message_size(field["type"])
+                    layout.append(
+                        {
+                            "expr": expr,
+                            "format": f"{count * size}s",
+                            "field": field,
+                            "messages": True,
+                            "count": count,
+                            "size": size,
+                        }
+                    )
+                else:
+                    for i in range(count):
+                        layout += self._struct_layout(field["type"], f"{expr}[{i}]")
+            else:
+                layout += self._struct_layout(field["type"], expr)
+
+        # keep local bitfield names unique once nested layouts are merged
+        for index, member in enumerate(layout):
+            if "bitfield" in member:
+                member["expr"] = f"bitfield_{index}"
+        return layout
+
+    def _message_size(self, message):
+        return struct.calcsize(self._struct_format(message))
+
+    def _struct_format(self, message):
+        return ">" + "".join(member["format"] for member in self._struct_layout(message))
+
+    def _generate_message_struct(self, message):
+        return f'{self.tab()}_STRUCT = struct.Struct("{self._struct_format(message)}")\n\n'
+
+    def _generate_message_struct_serialization_helper(self, message):
+        line = f"{self.tab()}def serialize(self) -> bytes:\n"
+        self.indent()
+        line += self._struct_pack_call(message, "self._STRUCT.pack(", "return ")
+        self.dedent()
+        line += "\n"
+
+        # pack_into writes straight into the caller's buffer, so encoding allocates nothing
+        line += f"{self.tab()}def serialize_into(self, buf, offset=0) -> int:\n"
+        self.indent()
+        line += self._struct_pack_call(message, "self._STRUCT.pack_into(buf, offset, ")
+        line += f"{self.tab()}return {self._message_size(message)}\n"
+        self.dedent()
+        return line + "\n"
+
+    def _struct_pack_call(self, message, call, prefix=""):
+        layout = self._struct_layout(message)
+        line = ""
+        for member in layout:
+            if "bitfield" in member:
+                line += self._struct_pack_bitfield(member)
+        line += f"{self.tab()}{prefix}{call}\n"
+        self.indent()
+        for member in layout:
+            if "array" in member:
+                line += f'{self.tab()}pack_array({member["array"]}, {member["expr"]}, {member["count"]}),\n'
+            elif "messages" in member:
+                line += f'{self.tab()}pack_messages({member["expr"]}, {member["count"]}),\n'
+            else:
+                line += f"{self.tab()}{member['expr']},\n"
+        self.dedent()
+        line += f"{self.tab()})\n"
+        return line
+
+    def _generate_message_struct_deserialization_helper(self, message):
+        layout = self._struct_layout(message)
+        line = f"{self.tab()}def deserialize(self, byteArr):\n"
+        self.indent()
+        line += f"{self.tab()}self.deserialize_from(byteArr)\n\n"
+        self.dedent()
+
+        # unpack_from reads any buffer protocol object in place, so nothing is copied
+        line += f"{self.tab()}def deserialize_from(self, buffer, offset=0) -> int:\n"
+        self.indent()
+        unpack = f"self._STRUCT.unpack_from(buffer, offset)"
+
+        # flat messages unpack straight into their attributes
+        if all("bitfield" not in member and "array" not in member and "messages" not in member for member in layout):
+            line += f"{self.tab()}(\n"
+            self.indent()
+            for member in layout:
+                line += f"{self.tab()}{member['expr']},\n"
+            self.dedent()
+            line += f"{self.tab()}) = {unpack}\n"
+        else:
+            line += f"{self.tab()}{self.valuesVName} = {unpack}\n"
+            for index, member in enumerate(layout):
+                value = f"{self.valuesVName}[{index}]"
+                if "bitfield" in member:
+                    line += self._struct_unpack_bitfield(member, value)
+                elif "array" in member:
+                    line += f'{self.tab()}{member["expr"]} = unpack_array({member["array"]}, {value})\n'
+                elif "messages" in member:
+                    line += f'{self.tab()}for index, element in enumerate({member["expr"]}):\n'
+                    self.indent()
+                    line += f'{self.tab()}element.deserialize_from({value}, index * {member["size"]})\n'
+                    self.dedent()
+                else:
+                    line += f"{self.tab()}{member['expr']} = {value}\n"
+        line += f"{self.tab()}return {self._message_size(message)}\n"
+        self.dedent()
+        return line + "\n"
+
+    def _struct_pack_bitfield(self, member):
+        # fields are packed MSB first, then every byte is bit reversed through a lookup
+        # table, which reproduces the BitStream + reverse_bits wire format
+        terms = [
+            f"({self._bitfield_member_expr(field, member['prefix'])} & {hex(mask)}) << {shift}"
+            for field, shift, mask in self._bitfield_shifts(member["field"])
+        ]
+        value = " | ".join(terms) if terms else "0"
+        size = self._bitfield_byte_count(member["field"])
+        return f'{self.tab()}{member["expr"]} = ({value}).to_bytes({size}, "big").translate(BIT_REVERSE)\n'
+
+    def _struct_unpack_bitfield(self, member, value):
+        name = member["expr"]
+        line = f'{self.tab()}{name} = int.from_bytes({value}.translate(BIT_REVERSE), "big")\n'
+        for field, shift, mask in self._bitfield_shifts(member["field"]):
+            line += f"{self.tab()}{self._bitfield_member_expr(field, member['prefix'])} = {name} >> {shift} & {hex(mask)}\n"
+        return line
+
+    def _bitfield_shifts(self, bf):
+        # (field, shift, mask) for every named member of a bitfield group. Padding
+        # entries from merge_adjacent_bitfields take up bits but are always zero.
+        shifts = []
+        remaining = sum(int(field["count"]) for field in bf["fields"])
+        for field in bf["fields"]:
+            count = int(field["count"])
+            remaining -= count
+            if not field.get(PADDING, False):
+                shifts.append((field, remaining, (1 << count) - 1))
+        return shifts
+
+    def _bitfield_member_expr(self, field, prefix="self"):
+        return f"{prefix}.{self._field_name(field)}"
+
+    def _bitfield_byte_count(self, bf):
+        return (int(bf["count"]) + 7) // 8
+
+    def _uses_builtin_arrays(self):
+        for message in self.ast_tree.message_iterator():
+            for field in message["fields"]:
+                if self.ast_tree.get_type(field) in BUILTINS.keys() and self.is_array(field):
+                    return True
+        return False
+
+    def _array_typecode_imports(self):
+        # names of the platform dependent type codes that builtin array fields use
+        typecodes = set()
+        for message in self.ast_tree.message_iterator():
+            for field in message["fields"]:
+                e_type = self.ast_tree.get_type(field)
+                if e_type in BUILTINS.keys() and self.is_array(field) and BUILTIN_TO_ARRAY[e_type].isidentifier():
+                    typecodes.add(BUILTIN_TO_ARRAY[e_type])
+        return sorted(typecodes)
+
+    def _uses_packed_message_arrays(self):
+        return any(
+            "messages" in member for message in self.ast_tree.message_iterator() for member in self._struct_layout(message)
+        )
+
     def generate_source_files(self, output_dir, source_name=None):
         this_dir = os.path.dirname(os.path.realpath(__file__))
         template_dir = os.path.join(this_dir, "..", "templates", "python")
@@ -235,6 +816,15 @@ class pythonGenerator(Generator):
         self._copy_template_file(
             f"{output_dir}/serializer", template_dir, "serializer.py"
         )
+        self._copy_template_file(
+            f"{output_dir}/serializer", template_dir, "protocol.py"
+        )
+        self._copy_template_file(
+            f"{output_dir}/serializer", template_dir, "parallel.py"
+        )
+        self._copy_template_file(
+            f"{output_dir}/serializer", template_dir, "capture.py"
+        )
 
         with open(f"{output_dir}/{source_name}.py", "w") as f:
             f.write(self.generate())
@@ -245,8 +835,11 @@ class pythonGenerator(Generator):
         count = self.get_count(field)
         e_type = self.get_language_type(field)
 
+        b_type = self.ast_tree.get_type(field)
         line = f"{self.tab()}{name}: "
-        if e_type != BF and (not is_number(count) or int(count) > 1):
+        if b_type in BUILTINS.keys() and self.is_array(field) and self.backend == self.STRUCT:
+            line += f"'array.array'\n"
+        elif b_type != BF and (not is_number(count) or int(count) > 1):
             line += f"List['{e_type}']\n"
         else:
             line += f"'{e_type}'\n"
@@ -263,22 +856,36 @@ class pythonGenerator(Generator):
         line = f"{self.tab()}def __init__(self):\n"
         self.indent()
         for field in message["fields"]:
-            name = self._field_name(field)
-            count = self.get_count(field)
-            e_type = self.get_language_type(field)
-            dv = self.get_default_value(field)
-
-            if e_type != BF and (not is_number(count) or int(count) > 1):
-                line += f"{self.tab()}self.{name} = [{e_type}] * {count}\n"
-            elif dv is not None:
-                line += f"{self.tab()}self.{name} = {dv}\n"
-            elif e_type not in BUILTIN_TO_PYTHON.keys():
-                line += f"{self.tab()}self.{name} = {e_type}()\n"
+            if self.ast_tree.get_type(field) == BF:
+                for bf_field in field["fields"]:
+                    if not bf_field.get(PADDING, False):
+                        line += self._generate_field_initializer(bf_field)
             else:
-                line += f"{self.tab()}self.{name} = {BUILTINS[e_type][DEFAULT_VALUE]}\n"
+                line += self._generate_field_initializer(field)
         self.dedent()
         return f"{line}\n\n"
 
+    def _generate_field_initializer(self, field):
+        name = self._field_name(field)
+        count = self.get_count(field)
+        b_type = self.ast_tree.get_type(field)
+        dv = self.get_default_value(field)
+
+        if b_type in BUILTINS.keys():
+            value = dv if dv is not None else BUILTINS[b_type][DEFAULT_VALUE]
+        elif b_type == BF:
+            value = dv if dv is not None else 0
+        else:
+            value = f"{self.get_language_type(field)}()"
+
+        if b_type == BF or not self.is_array(field):
+            return f"{self.tab()}self.{name} = {value}\n"
+        if b_type in BUILTINS.keys() and self.backend == self.STRUCT:
+            return f'{self.tab()}self.{name} = array.array({BUILTIN_TO_ARRAY[b_type]}, [{value}]) * {count}\n'
+        if b_type in BUILTINS.keys():
+            return f"{self.tab()}self.{name} = [{value}] * {count}\n"
+        return f"{self.tab()}self.{name} = [{value} for _ in range({count})]\n"
+
     def _field_name(self, field):
         # needed so python doesn't mangle names with __
         name = field["name"]
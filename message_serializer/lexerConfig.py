@@ -40,6 +40,7 @@ STATEFIELD = "stateField"
 INT_TYPES = [U8, U16, U32, U64, I8, I16, I32, I64]
 FLOAT_TYPES = [F32, F64]
 DEFAULT_VALUE = "defaultValue"
+PADDING = "padding"
 
 BUILTINS = {
     U8: {
@@ -431,6 +431,7 @@ def merge_adjacent_bitfields(entries):
                         "count": padding_bits,
                         "default_value": 0,
                         "line": entry["line"],
+                        PADDING: True,
                     }
                 )
 
@@ -40,6 +40,68 @@ BUILTIN_TO_BIT_STRINGS = {
     F64: "floatbe:64",
 }
 
+# message arrays that would flatten to more struct members than this are packed one
+# element at a time instead, by the struct backend and by the runtime codecs
+STRUCT_UNROLL_LIMIT = 32
+
+# big-endian struct format characters, sized to match each builtin's BITLENGTH
+BUILTIN_TO_STRUCT = {
+    U8: "B",
+    U16: "H",
+    U32: "I",
+    U64: "Q",
+    I8: "b",
+    I16: "h",
+    I32: "i",
+    I64: "q",
+    F32: "f",
+    F64: "d",
+}
+
+# python expressions for the array.array type code with the same item size as each
+# builtin. The item size of "I" and "i" depends on the platform, so the 32 bit builtins
+# use type codes that serializer.py picks when it is imported.
+BUILTIN_TO_ARRAY = {
+    U8: '"B"',
+    U16: '"H"',
+    U32: "U32_TYPECODE",
+    U64: '"Q"',
+    I8: '"b"',
+    I16: '"h"',
+    I32: "I32_TYPECODE",
+    I64: '"q"',
+    F32: '"f"',
+    F64: '"d"',
+}
+
+# big-endian numpy dtype strings, used to build each message's structured DTYPE
+BUILTIN_TO_DTYPE = {
+    U8: ">u1",
+    U16: ">u2",
+    U32: ">u4",
+    U64: ">u8",
+    I8: ">i1",
+    I16: ">i2",
+    I32: ">i4",
+    I64: ">i8",
+    F32: ">f4",
+    F64: ">f8",
+}
+
+# ctypes types for each builtin, laid out big-endian inside a BigEndianStructure
+BUILTIN_TO_CTYPES = {
+    U8: "ctypes.c_uint8",
+    U16: "ctypes.c_uint16",
+    U32: "ctypes.c_uint32",
+    U64: "ctypes.c_uint64",
+    I8: "ctypes.c_int8",
+    I16: "ctypes.c_int16",
+    I32: "ctypes.c_int32",
+    I64: "ctypes.c_int64",
+    F32: "ctypes.c_float",
+    F64: "ctypes.c_double",
+}
+
 BUILTIN_TO_PYTHON = {
     U8: U8PY,
     U16: U16PY,
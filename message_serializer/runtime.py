@@ -0,0 +1,406 @@
+"""
+Runtime codecs, for services that load message definitions while running and
+can't generate and import code. A codecRegistry is built from the ast returned
+by Directory.validate(), or from the JSON written by ast.jsonPrint(), and holds
+one messageCodec per message. Messages are plain dicts, nested messages are
+nested dicts and arrays are lists. The wire format is the same as the generated
+code's.
+
+Every message is first reduced to a normalized schema of plain tuples. Each
+schema is compiled into one struct format and straight-line encode and decode
+functions, like the methods of the generated classes, and cached by the
+schema's hash, so loading the same definitions again reuses them. As in the
+generated code, builtin arrays are converted in bulk and large arrays of nested
+messages go through the element's own codec, so the source stays small.
+"""
+
+import hashlib
+import importlib.util
+import json
+import os
+import struct
+
+from message_serializer.ast import ast, is_number
+from message_serializer.lexerConfig import *
+from message_serializer.python_config import BUILTIN_TO_ARRAY, BUILTIN_TO_DTYPE, BUILTIN_TO_STRUCT, STRUCT_UNROLL_LIMIT
+
+
+def _load_template(name):
+    # the python templates are copied next to generated code rather than installed,
+    # load the repo's copy so the wire constants have a single definition
+    this_dir = os.path.dirname(os.path.realpath(__file__))
+    path = os.path.join(this_dir, "..", "templates", "python", f"{name}.py")
+    spec = importlib.util.spec_from_file_location(f"message_serializer._templates.{name}", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+_serializer = _load_template("serializer")
+FRAME_HEADER = _serializer.FRAME_HEADER
+BIT_REVERSE = _serializer.BIT_REVERSE
+
+# compiled codecs by schema hash
+_CODECS = {}
+
+
+class messageCodec:
+    """Encodes and decodes one message type, compiled from its normalized schema."""
+
+    def __init__(self, schema):
+        self.schema = schema
+        self.name = schema[0]
+        self.hash = schema_hash(schema)
+        self._dtype = None
+
+        source = _codecSource()
+        decoded = source.walk(schema[1], "m")
+        self.struct = struct.Struct(">" + source.format)
+        self.size = self.struct.size
+        # number of struct members, which decides whether arrays of this message are unrolled
+        self.members = source.index
+        self.source = source.code(decoded, self.size)
+        namespace = {
+            "unpack_from": self.struct.unpack_from,
+            "pack": self.struct.pack,
+            "pack_into": self.struct.pack_into,
+            "BIT_REVERSE": BIT_REVERSE,
+            "pack_array": _serializer.pack_array,
+            "unpack_array": _serializer.unpack_array,
+            "U32_TYPECODE": _serializer.U32_TYPECODE,
+            "I32_TYPECODE": _serializer.I32_TYPECODE,
+            "pack_messages": _pack_messages,
+        }
+        namespace.update(source.namespace)
+        exec(compile(self.source, f"<codec {self.name}>", "exec"), namespace)
+        self.decode = namespace["decode"]
+        self.encode = namespace["encode"]
+        self.encode_into = namespace["encode_into"]
+
+    def __repr__(self):
+        return f"messageCodec({self.name}, {self.size} bytes)"
+
+    def new(self) -> dict:
+        """Returns a message holding the default value of every field."""
+        return _defaults(self.schema)
+
+    @property
+    def dtype(self):
+        """numpy dtype with the same layout as the wire format, see decode_batch()
+        of the generated code. Bitfield groups are kept as their raw bytes."""
+        if self._dtype is None:
+            import numpy as np
+
+            self._dtype = np.dtype(_dtype_members(self.schema))
+        return self._dtype
+
+    def decode_batch(self, buffer, count=-1, offset=0):
+        """Decodes a contiguous run of messages into a record array viewing buffer."""
+        import numpy as np
+
+        return np.frombuffer(buffer, dtype=self.dtype, count=count, offset=offset).view(np.recarray)
+
+
+class codecRegistry:
+    """The codecs of every message of a set of definitions, indexed by word ID
+    (messages are numbered in the same order as the generated wordIds) and by
+    name. Messages of an ast are also reachable by "MODULE.name"."""
+
+    def __init__(self, schemas, scoped_names=None):
+        self.codecs = [compile_codec(schema) for schema in schemas]
+        self.names = {}
+        for word_id, codec in enumerate(self.codecs):
+            self.names.setdefault(codec.name, word_id)
+        for word_id, name in enumerate(scoped_names or []):
+            self.names[name] = word_id
+
+    @classmethod
+    def from_ast(cls, tree: ast) -> "codecRegistry":
+        """Builds the codecs of a validated ast."""
+        messages = list(tree.message_iterator())
+        schemas = [normalize_message(message, tree.resolve_count) for message in messages]
+        scoped = [f"{message['parent']['name']}.{message['name']}" for message in messages]
+        return cls(schemas, scoped)
+
+    @classmethod
+    def from_json(cls, source) -> "codecRegistry":
+        """Builds the codecs from the output of ast.jsonPrint(), given as a file,
+        a JSON string or the already loaded list."""
+        if hasattr(source, "read"):
+            source = source.read()
+        elements = json.loads(source) if isinstance(source, str) else source
+        states = [element for element in elements if element["type"] == STATE]
+        resolve = lambda value: _resolve_json_value(value, states)
+        return cls(normalize_message(element, resolve) for element in elements if element["type"] == "MSG")
+
+    def __len__(self):
+        return len(self.codecs)
+
+    def __getitem__(self, key) -> messageCodec:
+        """Returns the codec of a word ID or message name."""
+        if isinstance(key, str):
+            key = self.names[key]
+        return self.codecs[key]
+
+    def encode_frame(self, key, values: dict) -> bytes:
+        """Serializes a message given by word ID or name behind a FRAME_HEADER."""
+        word_id = self.names[key] if isinstance(key, str) else key
+        codec = self.codecs[word_id]
+        return FRAME_HEADER.pack(word_id, codec.size) + codec.encode(values)
+
+    def decode_any(self, buffer, offset=0):
+        """Decodes the frame at offset in buffer. Returns the word ID, the message
+        and the number of bytes consumed, header included."""
+        word_id, length = FRAME_HEADER.unpack_from(buffer, offset)
+        if word_id >= len(self.codecs):
+            raise ValueError(f"Unknown word ID {word_id} at offset {offset}")
+        codec = self.codecs[word_id]
+        if length != codec.size:
+            raise ValueError(f"Frame at offset {offset} is {length} bytes, {codec.name} is {codec.size} bytes")
+        return word_id, codec.decode(buffer, offset + FRAME_HEADER.size), FRAME_HEADER.size + length
+
+
+"""===================================================================================================
+                                                SCHEMAS
+    =================================================================================================="""
+
+
+def normalize_message(message, resolve):
+    """Reduces a message of an ast, or of its JSON, to a schema made of tuples:
+    (name, fields), where every field is one of
+        (name, "scalar", type, default)
+        (name, "array", type, count, default)
+        (name, "message", schema)
+        (name, "messages", schema, count)
+        (name, "bitfield", bytes, ((name, shift, mask, default), ...))
+    resolve(value) returns the number a count or default value refers to."""
+    fields = []
+    for field in message["fields"]:
+        e_type = _type_name(field)
+        name = field["name"]
+        if e_type == BF:
+            fields.append((name, "bitfield", (int(field["count"]) + 7) // 8, _normalize_bitfield(field, resolve)))
+            continue
+        # same rule as the generators: a count given by reference is always an array
+        array = not is_number(field["count"]) or int(field["count"]) > 1
+        if e_type in BUILTINS.keys():
+            default = _default_value(field, e_type, resolve)
+            if array:
+                fields.append((name, "array", e_type, resolve(field["count"]), default))
+            else:
+                fields.append((name, "scalar", e_type, default))
+        else:
+            nested = normalize_message(field["type"], resolve)
+            if array:
+                fields.append((name, "messages", nested, resolve(field["count"])))
+            else:
+                fields.append((name, "message", nested))
+    return (message["name"], tuple(fields))
+
+
+def _normalize_bitfield(bf, resolve):
+    # same bit order as the generated code, padding members take up bits but are always zero
+    members = []
+    remaining = sum(int(field["count"]) for field in bf["fields"])
+    for field in bf["fields"]:
+        count = int(field["count"])
+        remaining -= count
+        if not field.get(PADDING, False):
+            default = _number(field["default_value"], resolve) if field.get("default_value") is not None else 0
+            members.append((field["name"], remaining, (1 << count) - 1, default))
+    return tuple(members)
+
+
+def _default_value(field, e_type, resolve):
+    value = field.get("default_value")
+    value = BUILTINS[e_type][DEFAULT_VALUE] if value is None else _number(value, resolve)
+    return float(value) if e_type in FLOAT_TYPES else int(value)
+
+
+def _number(value, resolve):
+    # constants may hold floats, which resolve() (like ast.resolve_count) doesn't accept
+    if isinstance(value, dict) and _type_name(value) != STATEFIELD:
+        return _number(value["default_value"], resolve)
+    if isinstance(value, str) and "." in value:
+        return float(value)
+    return resolve(value)
+
+
+def _type_name(element):
+    return element["type"]["name"] if isinstance(element["type"], dict) else element["type"]
+
+
+def _resolve_json_value(value, states):
+    # ast.resolve_count for JSON elements, which have lost their parent links
+    if isinstance(value, dict):
+        if _type_name(value) == STATEFIELD:
+            return _resolve_json_state_field(value, states)
+        return _resolve_json_value(value["default_value"], states)
+    return int(value)
+
+
+def _resolve_json_state_field(state_field, states):
+    for state in states:
+        value = -1
+        for field in state["fields"]:
+            if field["default_value"] is not None:
+                value = _resolve_json_value(field["default_value"], states)
+            else:
+                value += 1
+            if field == state_field:
+                return value
+    raise ValueError(f"Could not find state {state_field['name']}")
+
+
+def schema_hash(schema) -> str:
+    """Returns a stable hash of a normalized schema."""
+    return hashlib.sha256(repr(schema).encode()).hexdigest()
+
+
+def compile_codec(schema) -> messageCodec:
+    """Returns the codec of a normalized schema, compiling it only once."""
+    key = schema_hash(schema)
+    codec = _CODECS.get(key)
+    if codec is None:
+        codec = _CODECS[key] = messageCodec(schema)
+    return codec
+
+
+"""===================================================================================================
+                                                COMPILATION
+    =================================================================================================="""
+
+
+class _codecSource:
+    # builds the python source of a codec's functions while walking its schema. The
+    # struct format, the decoded dict literal and the encode arguments are built in
+    # the same walk, so they follow the same member order.
+
+    def __init__(self):
+        self.format = ""
+        self.index = 0
+        self.locals = 0
+        self.decode_lines = []
+        self.encode_lines = []
+        self.arguments = []
+        # element codecs of message arrays that aren't unrolled, by local name
+        self.namespace = {}
+
+    def local(self):
+        self.locals += 1
+        return f"_{self.locals}"
+
+    def walk(self, fields, message):
+        # returns the dict literal decoding fields, message is the expression holding
+        # the fields' dict when encoding
+        items = []
+        for field in fields:
+            name, kind = field[0], field[1]
+            if kind == "scalar":
+                self.format += BUILTIN_TO_STRUCT[field[2]]
+                items.append(f"{name!r}: v[{self.index}]")
+                self.arguments.append(f"{message}[{name!r}]")
+                self.index += 1
+            elif kind == "array":
+                # one raw block, converted in bulk like the generated code's pack_array/unpack_array
+                count, typecode = field[3], BUILTIN_TO_ARRAY[field[2]]
+                self.format += f"{count * struct.calcsize(BUILTIN_TO_STRUCT[field[2]])}s"
+                items.append(f"{name!r}: unpack_array({typecode}, v[{self.index}]).tolist()")
+                self.arguments.append(f"pack_array({typecode}, {message}[{name!r}], {count})")
+                self.index += 1
+            elif kind == "bitfield":
+                self.format += f"{field[2]}s"
+                raw = self.local()
+                self.decode_lines.append(f'{raw} = int.from_bytes(v[{self.index}].translate(BIT_REVERSE), "big")')
+                packed = " | ".join(f"({message}[{member!r}] & {mask}) << {shift}" for member, shift, mask, _ in field[3])
+                self.encode_lines.append(f'{raw} = ({packed or 0}).to_bytes({field[2]}, "big").translate(BIT_REVERSE)')
+                items += [f"{member!r}: {raw} >> {shift} & {mask}" for member, shift, mask, _ in field[3]]
+                self.arguments.append(raw)
+                self.index += 1
+            elif kind == "message":
+                nested = self.local()
+                self.encode_lines.append(f"{nested} = {message}[{name!r}]")
+                items.append(f"{name!r}: {self.walk(field[2][1], nested)}")
+            elif field[3] * compile_codec(field[2]).members > STRUCT_UNROLL_LIMIT:
+                # large arrays travel as one raw block that the element's codec reads slice by slice
+                count, element = field[3], compile_codec(field[2])
+                decode, encode = self.local(), self.local()
+                self.namespace[decode] = element.decode
+                self.namespace[encode] = element.encode
+                self.format += f"{count * element.size}s"
+                slices = f"range(0, {count * element.size}, {element.size})"
+                items.append(f"{name!r}: [{decode}(v[{self.index}], at) for at in {slices}]")
+                self.arguments.append(f"pack_messages({encode}, {message}[{name!r}], {count})")
+                self.index += 1
+            else:
+                array = self.local()
+                self.encode_lines.append(f"{array} = {message}[{name!r}]")
+                elements = []
+                for index in range(field[3]):
+                    nested = self.local()
+                    self.encode_lines.append(f"{nested} = {array}[{index}]")
+                    elements.append(self.walk(field[2][1], nested))
+                items.append(f"{name!r}: [{', '.join(elements)}]")
+        return "{" + ", ".join(items) + "}"
+
+    def code(self, decoded, size):
+        body = lambda lines: "".join(f"    {line}\n" for line in lines)
+        arguments = ", ".join(self.arguments)
+        return (
+            "def decode(buffer, offset=0):\n"
+            '    """Returns the message at offset in buffer as a dict."""\n'
+            "    v = unpack_from(buffer, offset)\n"
+            + body(self.decode_lines)
+            + f"    return {decoded}\n\n"
+            "def encode(m):\n"
+            '    """Returns the wire bytes of a message given as a dict."""\n'
+            + body(self.encode_lines)
+            + f"    return pack({arguments})\n\n"
+            "def encode_into(m, buf, offset=0):\n"
+            '    """Serializes a message given as a dict into buf at offset and returns the size."""\n'
+            + body(self.encode_lines)
+            + f"    pack_into(buf, offset, {arguments})\n"
+            + f"    return {size}\n"
+        )
+
+
+def _pack_messages(encode, messages, count):
+    # pack_messages() of the generated code, for messages given as dicts
+    if len(messages) != count:
+        raise ValueError(f"Array has {len(messages)} values, expected {count}")
+    return b"".join([encode(message) for message in messages])
+
+
+def _defaults(schema):
+    message = {}
+    for field in schema[1]:
+        kind = field[1]
+        if kind == "scalar":
+            message[field[0]] = field[3]
+        elif kind == "array":
+            message[field[0]] = [field[4]] * field[3]
+        elif kind == "bitfield":
+            for name, _, _, default in field[3]:
+                message[name] = default
+        elif kind == "message":
+            message[field[0]] = _defaults(field[2])
+        else:
+            message[field[0]] = [_defaults(field[2]) for _ in range(field[3])]
+    return message
+
+
+def _dtype_members(schema):
+    members = []
+    for field in schema[1]:
+        kind = field[1]
+        if kind == "scalar":
+            members.append((field[0], BUILTIN_TO_DTYPE[field[2]]))
+        elif kind == "array":
+            members.append((field[0], BUILTIN_TO_DTYPE[field[2]], (field[3],)))
+        elif kind == "bitfield":
+            members.append((field[0], ">u1", (field[2],)))
+        elif kind == "message":
+            members.append((field[0], _dtype_members(field[2])))
+        else:
+            members.append((field[0], _dtype_members(field[2]), (field[3],)))
+    return members
@@ -37,3 +37,68 @@ void serializer::hton(uint8_t *data, uint8_t *buffer, int size)
         break;
     }
 }
+
+int serializer::writeFrameHeader(uint16_t id, uint16_t length, uint8_t *buffer)
+{
+    uint8_t *itr = buffer;
+    HTON(&id, itr, sizeof(id));
+    HTON(&length, itr, sizeof(length));
+    return itr - buffer;
+}
+
+int serializer::readFrameHeader(uint8_t *buffer, uint16_t *id, uint16_t *length)
+{
+    uint8_t *itr = buffer;
+    NTOH(id, itr, sizeof(*id));
+    NTOH(length, itr, sizeof(*length));
+    return itr - buffer;
+}
+
+int serializer::encodeKeyFrame(const uint8_t *current, int size, int fieldCount, uint8_t *buffer)
+{
+    int bitmapSize = (fieldCount + 7) / 8;
+    memset(buffer, 0, bitmapSize);
+    for (int i = 0; i < fieldCount; i++)
+        buffer[i / 8] |= 0x80 >> (i % 8);
+    memcpy(buffer + bitmapSize, current, size);
+    return bitmapSize + size;
+}
+
+int serializer::encodeDelta(const uint8_t *current, const uint8_t *baseline, const uint16_t *fieldOffsets, int fieldCount, uint8_t *buffer)
+{
+    int bitmapSize = (fieldCount + 7) / 8;
+    memset(buffer, 0, bitmapSize);
+    uint8_t *itr = buffer + bitmapSize;
+    for (int i = 0; i < fieldCount; i++) {
+        int size = fieldOffsets[i + 1] - fieldOffsets[i];
+        if (memcmp(current + fieldOffsets[i], baseline + fieldOffsets[i], size) != 0) {
+            buffer[i / 8] |= 0x80 >> (i % 8);
+            memcpy(itr, current + fieldOffsets[i], size);
+            itr += size;
+        }
+    }
+    return itr - buffer;
+}
+
+bool serializer::isKeyFrame(const uint8_t *delta, int fieldCount)
+{
+    for (int i = 0; i < fieldCount; i++) {
+        if (!(delta[i / 8] & (0x80 >> (i % 8))))
+            return false;
+    }
+    return true;
+}
+
+int serializer::applyDelta(const uint8_t *delta, uint8_t *baseline, const uint16_t *fieldOffsets, int fieldCount)
+{
+    int bitmapSize = (fieldCount + 7) / 8;
+    const uint8_t *itr = delta + bitmapSize;
+    for (int i = 0; i < fieldCount; i++) {
+        if (delta[i / 8] & (0x80 >> (i % 8))) {
+            int size = fieldOffsets[i + 1] - fieldOffsets[i];
+            memcpy(baseline + fieldOffsets[i], itr, size);
+            itr += size;
+        }
+    }
+    return itr - delta;
+}
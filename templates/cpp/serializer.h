@@ -1,7 +1,12 @@
 #ifndef __SERIALIZER__
 #define __SERIALIZER__
 
+// Supported standards: C++14 and later. The generated MAX_MESSAGE_SIZE needs C++14
+// constexpr functions; FIELD_OFFSETS, used by the delta templates, is defined out of
+// line in the generated .cpp, so it links with or without C++17 inline variables.
+
 #include <stdint.h>
+#include <string.h>
 
 #define HTON(data, buffer, size) serializer::hton((uint8_t*)data, buffer, size); buffer+=size
 #define NTOH(data, buffer, size) serializer::hton(buffer, (uint8_t*)data, size); buffer+=size
@@ -14,14 +19,100 @@ namespace serializer {
 
     void hton(uint8_t *data, uint8_t *buffer, int size);
 
+    // optional compact frame header placed in front of a serialized message: word ID, payload length
+    constexpr int FRAME_HEADER_SIZE = sizeof(uint16_t) + sizeof(uint16_t);
+
+    int writeFrameHeader(uint16_t id, uint16_t length, uint8_t *buffer);
+
+    int readFrameHeader(uint8_t *buffer, uint16_t *id, uint16_t *length);
+
+    // delta encoding of serialized messages, see deltaEncoder
+    int encodeKeyFrame(const uint8_t *current, int size, int fieldCount, uint8_t *buffer);
+
+    int encodeDelta(const uint8_t *current, const uint8_t *baseline, const uint16_t *fieldOffsets, int fieldCount, uint8_t *buffer);
+
+    bool isKeyFrame(const uint8_t *delta, int fieldCount);
+
+    int applyDelta(const uint8_t *delta, uint8_t *baseline, const uint16_t *fieldOffsets, int fieldCount);
+
 };
 
 struct serializableMessage {
     serializableMessage(const int id) : WORD_ID(id) {}
+    virtual ~serializableMessage() {}
     virtual int serialize(uint8_t *buffer) = 0;
     virtual int deserialize(uint8_t *buffer) = 0;
 
     const int WORD_ID;
 };
 
+/**
+* @brief Delta encodes a stream of messages of one type against the last message sent.
+* Each delta is a bitmap with a bit per top level field (first field in the most significant
+* bit of the first byte), followed by the serialized bytes of the fields that changed.
+* A key frame has every bit set and carries the whole message. The first message is always
+* a key frame, and so is every keyInterval-th message after it when keyInterval is set.
+* The output matches the python deltaEncoder.
+*/
+template <typename Message>
+class deltaEncoder {
+public:
+    deltaEncoder(int keyInterval = 0) : keyInterval(keyInterval) {}
+
+    // makes the next delta a key frame
+    void keyFrame() { hasBaseline = false; }
+
+    // writes the delta of msg to buffer, which must hold MAX_DELTA_SIZE bytes, and returns its size
+    int encode(Message &msg, uint8_t *buffer)
+    {
+        uint8_t current[Message::SIZE];
+        msg.serialize(current);
+        sinceKey++;
+        int written;
+        if (!hasBaseline || (keyInterval && sinceKey >= keyInterval)) {
+            sinceKey = 0;
+            written = serializer::encodeKeyFrame(current, Message::SIZE, Message::FIELD_COUNT, buffer);
+        } else {
+            written = serializer::encodeDelta(current, baseline, Message::FIELD_OFFSETS, Message::FIELD_COUNT, buffer);
+        }
+        memcpy(baseline, current, Message::SIZE);
+        hasBaseline = true;
+        return written;
+    }
+
+    static constexpr int MAX_DELTA_SIZE = (Message::FIELD_COUNT + 7) / 8 + Message::SIZE;
+
+private:
+    uint8_t baseline[Message::SIZE];
+    bool hasBaseline = false;
+    int keyInterval;
+    int sinceKey = 0;
+};
+
+/**
+* @brief Applies the deltas of a deltaEncoder onto a baseline of the last message.
+*/
+template <typename Message>
+class deltaDecoder {
+public:
+    // decodes the delta in buffer into msg and returns the bytes consumed, or -1 for a delta
+    // that arrives before the first key frame
+    int decode(const uint8_t *buffer, Message &msg)
+    {
+        if (!hasBaseline && !serializer::isKeyFrame(buffer, Message::FIELD_COUNT)) {
+            return -1;
+        }
+        int consumed = serializer::applyDelta(buffer, baseline, Message::FIELD_OFFSETS, Message::FIELD_COUNT);
+        hasBaseline = true;
+        msg.deserialize(baseline);
+        return consumed;
+    }
+
+    bool synchronized() const { return hasBaseline; }
+
+private:
+    uint8_t baseline[Message::SIZE];
+    bool hasBaseline = false;
+};
+
 #endif // __SERIALIZER__
\ No newline at end of file
@@ -0,0 +1,527 @@
+import array
+import lzma
+import os
+import struct
+import time
+import zlib
+
+from serializer.serializer import (
+    BIT_REVERSE,
+    FRAME_HEADER,
+    arrayAccessor,
+    bitfieldAccessor,
+    captureReader,
+    messageAccessor,
+    messageArrayAccessor,
+    messageRegistry,
+    pack_array,
+    scalarAccessor,
+    unpack_array,
+)
+
+# An indexed capture is a plain capture (frames written back to back by
+# encode_frame) followed by an index and a fixed size trailer. For every word ID
+# the index holds the number of messages and the frame offset of every
+# stride-th one of them, so the n-th message of a type is found by seeking to
+# checkpoint n // stride and skipping at most stride - 1 messages of that type.
+#
+#   frames | for each word ID: count (u64), checkpoint offsets (u64 each) | trailer
+
+INDEX_MAGIC = b"MSGI"
+# index offset, stride, number of word IDs, magic
+INDEX_TRAILER = struct.Struct(">QII4s")
+
+
+class captureWriter:
+    """Writes messages to an indexed capture file. The index is written by
+    close(), use as a context manager."""
+
+    def __init__(self, path, registry: messageRegistry, stride: int = 1024):
+        if stride < 1:
+            raise ValueError(f"Index stride must be at least 1, got {stride}")
+        self.registry = registry
+        self.stride = stride
+        self._file = open(path, "wb")
+        self._position = 0
+        self._counts = [0] * len(registry)
+        self._checkpoints = [array.array("Q") for _ in range(len(registry))]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def write(self, msg) -> None:
+        """Appends msg as a frame."""
+        word_id = msg.WORD_ID
+        count = self._counts[word_id]
+        if count % self.stride == 0:
+            self._checkpoints[word_id].append(self._position)
+        self._counts[word_id] = count + 1
+        frame = FRAME_HEADER.pack(word_id, msg.SIZE) + msg.serialize()
+        self._file.write(frame)
+        self._position += len(frame)
+
+    def close(self):
+        if self._file.closed:
+            return
+        index_offset = self._position
+        for count, checkpoints in zip(self._counts, self._checkpoints):
+            self._file.write(struct.pack(">Q", count))
+            self._file.write(pack_array("Q", checkpoints))
+        self._file.write(INDEX_TRAILER.pack(index_offset, self.stride, len(self._counts), INDEX_MAGIC))
+        self._file.close()
+
+
+class indexedCaptureReader(captureReader):
+    """Reads an indexed capture file written by captureWriter. Besides everything
+    captureReader does, it can count the messages of a word ID, seek to the n-th
+    message of a word ID, and iterate one word ID from any position, without
+    walking the frames before it."""
+
+    def __init__(self, path, registry: messageRegistry):
+        super().__init__(path, registry)
+        buffer = self.buffer
+        if len(buffer) < INDEX_TRAILER.size:
+            self.close()
+            raise ValueError(f"{path} is not an indexed capture")
+        index_offset, self.stride, word_ids, magic = INDEX_TRAILER.unpack_from(buffer, len(buffer) - INDEX_TRAILER.size)
+        if magic != INDEX_MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not an indexed capture")
+        self.index_offset = index_offset
+
+        self.counts = []
+        self.checkpoints = []
+        position = index_offset
+        for _ in range(word_ids):
+            (count,) = struct.unpack_from(">Q", buffer, position)
+            position += 8
+            size = -(-count // self.stride) * 8
+            self.counts.append(count)
+            self.checkpoints.append(unpack_array("Q", buffer[position : position + size]))
+            position += size
+
+    def __len__(self):
+        return sum(self.counts)
+
+    def frames(self, start=0, end=None):
+        # the index isn't a frame, stop in front of it
+        end = self.index_offset if end is None else min(end, self.index_offset)
+        return super().frames(start, end)
+
+    def count(self, word_id: int) -> int:
+        """Returns the number of messages with word_id."""
+        return self.counts[word_id] if word_id < len(self.counts) else 0
+
+    def offset(self, word_id: int, n: int) -> int:
+        """Returns the payload offset in self.buffer of the n-th message with word_id."""
+        if not 0 <= n < self.count(word_id):
+            raise IndexError(f"Capture has {self.count(word_id)} messages with word ID {word_id}, no message {n}")
+        skip = n % self.stride
+        for frame_id, offset, _ in self.frames(self.checkpoints[word_id][n // self.stride]):
+            if frame_id == word_id:
+                if skip == 0:
+                    return offset
+                skip -= 1
+
+    def message(self, word_id: int, n: int):
+        """Returns the n-th message with word_id, decoded."""
+        msg = self.registry.classes[word_id]()
+        msg.deserialize_from(self.buffer, self.offset(word_id, n))
+        return msg
+
+    def view(self, word_id: int, n: int):
+        """Returns a view of the n-th message with word_id."""
+        return self.registry.classes[word_id].VIEW(self.buffer, self.offset(word_id, n))
+
+    def messages(self, word_id=None, start=0):
+        """Lazily yields decoded messages. With a word_id, yields the messages of
+        that word ID from its start-th message on."""
+        if word_id is None:
+            yield from super().messages()
+            return
+        message = self.registry.classes[word_id]
+        for offset in self._offsets(word_id, start):
+            msg = message()
+            msg.deserialize_from(self.buffer, offset)
+            yield msg
+
+    def views(self, word_id=None, start=0):
+        """Like messages() but yields a message view per frame."""
+        if word_id is None:
+            yield from super().views()
+            return
+        view = self.registry.classes[word_id].VIEW
+        for offset in self._offsets(word_id, start):
+            yield view(self.buffer, offset)
+
+    def _offsets(self, word_id, start):
+        # payload offsets of the messages with word_id from the start-th on, walking
+        # from its checkpoint and no further than its last message
+        remaining = self.count(word_id) - start
+        if remaining <= 0:
+            return
+        first = self.offset(word_id, start)
+        for frame_id, offset, _ in self.frames(first - FRAME_HEADER.size):
+            if frame_id == word_id:
+                yield offset
+                remaining -= 1
+                if remaining == 0:
+                    return
+
+
+# A batch file is a sequence of independently compressed blocks of messages. The
+# uncompressed block is a sequence of runs, each a RUN_HEADER followed by the
+# payloads of count messages of one word ID back to back, so a run decodes with
+# a single decode_batch() call. Runs follow the order messages were written in,
+# or, for sorted blocks, there is one run per word ID.
+#
+#   BLOCK_HEADER | compressed(RUN_HEADER | payloads | RUN_HEADER | payloads ...) | BLOCK_HEADER | ...
+
+BATCH_MAGIC = b"MSGZ"
+# magic, compression method, message count, uncompressed size, compressed size
+BLOCK_HEADER = struct.Struct(">4sBIII")
+# word ID, message count
+RUN_HEADER = struct.Struct(">HI")
+COMPRESSION_METHODS = ["none", "zlib", "lzma"]
+
+
+class compressionStats:
+    """Running totals of a batchWriter or batchReader."""
+
+    def __init__(self):
+        self.messages = 0
+        self.blocks = 0
+        self.uncompressed_bytes = 0
+        self.compressed_bytes = 0
+        # time spent compressing or decompressing
+        self.seconds = 0.0
+
+    @property
+    def ratio(self) -> float:
+        """Uncompressed size over compressed size."""
+        return self.uncompressed_bytes / self.compressed_bytes if self.compressed_bytes else 0.0
+
+    @property
+    def mb_per_s(self) -> float:
+        """Uncompressed megabytes (10^6 bytes) compressed or decompressed per second."""
+        return self.uncompressed_bytes / self.seconds / 1e6 if self.seconds else 0.0
+
+    def __str__(self):
+        return (
+            f"{self.messages} messages in {self.blocks} blocks, {self.uncompressed_bytes} -> "
+            f"{self.compressed_bytes} bytes (ratio {self.ratio:.2f}), {self.mb_per_s:.1f} MB/s"
+        )
+
+
+class batchWriter:
+    """Writes messages to a batch file in compressed blocks of up to
+    block_messages messages. method is "zlib", "lzma" or "none", level its
+    compression level (the preset for lzma). With sort=True, every block groups
+    its messages by word ID, which compresses better and gives longer runs, but
+    only keeps the order of messages within a word ID. Use as a context manager,
+    or call close(); stats holds the compression ratio and throughput so far."""
+
+    def __init__(self, path, registry: messageRegistry, method="zlib", level=6, block_messages=4096, sort=False):
+        if method not in COMPRESSION_METHODS:
+            raise ValueError(f"Unknown compression method '{method}', expected one of {COMPRESSION_METHODS}")
+        self.registry = registry
+        self.method = method
+        self.level = level
+        self.block_messages = block_messages
+        self.sort = sort
+        self.stats = compressionStats()
+        self._file = open(path, "wb")
+        self._block = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def write(self, msg) -> None:
+        """Adds msg to the current block, compressing the block once it is full."""
+        self._block.append((msg.WORD_ID, msg.serialize()))
+        if len(self._block) >= self.block_messages:
+            self.flush()
+
+    def flush(self) -> None:
+        """Compresses and writes the current block, even if it isn't full."""
+        if not self._block:
+            return
+        block = sorted(self._block, key=lambda message: message[0]) if self.sort else self._block
+        self._block = []
+
+        parts = []
+        run_start = 0
+        for index in range(1, len(block) + 1):
+            if index == len(block) or block[index][0] != block[run_start][0]:
+                parts.append(RUN_HEADER.pack(block[run_start][0], index - run_start))
+                parts += [payload for _, payload in block[run_start:index]]
+                run_start = index
+        data = b"".join(parts)
+
+        start = time.perf_counter()
+        compressed = _compress(self.method, self.level, data)
+        self.stats.seconds += time.perf_counter() - start
+        self._file.write(
+            BLOCK_HEADER.pack(BATCH_MAGIC, COMPRESSION_METHODS.index(self.method), len(block), len(data), len(compressed))
+        )
+        self._file.write(compressed)
+        self.stats.messages += len(block)
+        self.stats.blocks += 1
+        self.stats.uncompressed_bytes += len(data)
+        self.stats.compressed_bytes += BLOCK_HEADER.size + len(compressed)
+
+    def close(self):
+        if self._file.closed:
+            return
+        self.flush()
+        self._file.close()
+
+
+class batchReader:
+    """Reads a batch file written by batchWriter one block at a time. stats holds
+    the decompression ratio and throughput so far."""
+
+    def __init__(self, path, registry: messageRegistry):
+        self.registry = registry
+        self.stats = compressionStats()
+        self._file = open(path, "rb")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __iter__(self):
+        return self.messages()
+
+    def close(self):
+        self._file.close()
+
+    def blocks(self):
+        """Yields every block decompressed, as (message count, data)."""
+        self._file.seek(0)
+        while True:
+            header = self._file.read(BLOCK_HEADER.size)
+            if not header:
+                return
+            if len(header) < BLOCK_HEADER.size:
+                raise ValueError("Truncated block header")
+            magic, method, count, size, compressed_size = BLOCK_HEADER.unpack(header)
+            if magic != BATCH_MAGIC or method >= len(COMPRESSION_METHODS):
+                raise ValueError(f"Invalid block header at offset {self._file.tell() - BLOCK_HEADER.size}")
+            compressed = self._file.read(compressed_size)
+            if len(compressed) < compressed_size:
+                raise ValueError("Truncated block")
+
+            start = time.perf_counter()
+            data = _decompress(COMPRESSION_METHODS[method], compressed, size)
+            self.stats.seconds += time.perf_counter() - start
+            if len(data) != size:
+                raise ValueError(f"Block decompressed to {len(data)} bytes, expected {size}")
+            self.stats.messages += count
+            self.stats.blocks += 1
+            self.stats.uncompressed_bytes += size
+            self.stats.compressed_bytes += BLOCK_HEADER.size + compressed_size
+            yield count, data
+
+    def runs(self):
+        """Yields (word_id, count, data, offset) for every run of messages, where
+        the run's payloads start at offset in data."""
+        for _, data in self.blocks():
+            offset = 0
+            while offset < len(data):
+                word_id, count = RUN_HEADER.unpack_from(data, offset)
+                offset += RUN_HEADER.size
+                if word_id >= len(self.registry):
+                    raise ValueError(f"Unknown word ID {word_id} in batch")
+                yield word_id, count, data, offset
+                offset += count * self.registry.sizes[word_id]
+
+    def messages(self, word_id=None):
+        """Lazily yields decoded messages, optionally only those of one word ID."""
+        classes = self.registry.classes
+        sizes = self.registry.sizes
+        for run_id, count, data, offset in self.runs():
+            if word_id is not None and run_id != word_id:
+                continue
+            message = classes[run_id]
+            size = sizes[run_id]
+            for index in range(count):
+                msg = message()
+                msg.deserialize_from(data, offset + index * size)
+                yield msg
+
+    def batches(self, word_id=None):
+        """Yields (word_id, record array) for every run, optionally only those of
+        one word ID, decoded with decode_batch()."""
+        classes = self.registry.classes
+        for run_id, count, data, offset in self.runs():
+            if word_id is None or run_id == word_id:
+                yield run_id, classes[run_id].decode_batch(data, count, offset)
+
+
+def _compress(method, level, data):
+    if method == "zlib":
+        return zlib.compress(data, level)
+    if method == "lzma":
+        return lzma.compress(data, preset=level)
+    return data
+
+
+def _decompress(method, data, size):
+    if method == "zlib":
+        # the block header's size lets zlib allocate its output once
+        return zlib.decompress(data, bufsize=max(size, 1))
+    if method == "lzma":
+        return lzma.decompress(data)
+    return data
+
+
+# .npy header written in front of every exported column. Its length is fixed, so
+# the header can be rewritten with the final row count once the column is done.
+NPY_HEADER_SIZE = 128
+
+
+def export_columns(path, registry: messageRegistry, directory, chunk_messages=65536) -> dict:
+    """Converts a framed capture into one directory per word ID, named like its
+    wordIds member, holding one .npy file per field. Nested fields are flattened
+    into dotted names (lightStatuses.0.brightness), builtin arrays become 2-D
+    columns and bitfield members get their own columns, all in native byte
+    order so they can be opened with np.load(mmap_mode="r"). Messages are
+    buffered and appended to the columns chunk_messages at a time per word ID,
+    so memory stays bounded however large the capture is. Returns the number
+    of messages exported for each word ID."""
+    os.makedirs(directory, exist_ok=True)
+    exporters = {}
+    with captureReader(path, registry) as capture:
+        buffer = capture.buffer
+        for word_id, offset, length in capture.frames():
+            exporter = exporters.get(word_id)
+            if exporter is None:
+                if word_id >= len(registry):
+                    raise ValueError(f"Unknown word ID {word_id} at offset {offset - FRAME_HEADER.size}")
+                exporter = exporters[word_id] = _columnExporter(registry.classes[word_id], directory)
+            if length != exporter.size:
+                raise ValueError(
+                    f"Frame at offset {offset - FRAME_HEADER.size} is {length} bytes, "
+                    f"{registry.classes[word_id].__name__} is {exporter.size} bytes"
+                )
+            exporter.pending += buffer[offset : offset + length]
+            if len(exporter.pending) >= chunk_messages * length:
+                exporter.flush()
+    for exporter in exporters.values():
+        exporter.close()
+    return {word_id: exporter.count for word_id, exporter in exporters.items()}
+
+
+class _columnExporter:
+    # appends the columns of one word ID to its .npy files
+
+    def __init__(self, message, directory):
+        import numpy as np
+
+        self.size = message.SIZE
+        self.directory = os.path.join(directory, message.__qualname__.replace(".", "__"))
+        self.pending = bytearray()
+        self.count = 0
+        os.makedirs(self.directory, exist_ok=True)
+
+        # every leaf of the layout becomes a field of one flat dtype with explicit
+        # offsets, so a chunk splits into its columns with a single frombuffer()
+        columns = _layout_columns(message.VIEW)
+        self.bitfields = {name: spec for name, _, _, spec in columns if spec is not None}
+        self.layout = np.dtype(
+            {
+                "names": [name for name, _, _, _ in columns],
+                "formats": [dtype for _, dtype, _, _ in columns],
+                "offsets": [offset for _, _, offset, _ in columns],
+                "itemsize": self.size,
+            }
+        )
+        # column dtypes, in native byte order, and the shape of one row
+        self.columns = {}
+        for name, dtype, _, spec in columns:
+            if spec is not None:
+                column = np.min_scalar_type(spec[2]), ()
+            else:
+                dtype = np.dtype(dtype)
+                column = dtype.base.newbyteorder("="), dtype.shape
+            self.columns[name] = column
+            with open(self._path(name), "wb") as f:
+                f.write(self._header(*column, 0))
+
+    def flush(self):
+        import numpy as np
+
+        if not self.pending:
+            return
+        records = np.frombuffer(self.pending, dtype=self.layout)
+        for name, (dtype, _) in self.columns.items():
+            values = records[name]
+            if name in self.bitfields:
+                values = _extract_bitfield(values, *self.bitfields[name])
+            with open(self._path(name), "ab") as f:
+                f.write(np.ascontiguousarray(values, dtype=dtype).tobytes())
+        self.count += len(records)
+        del records
+        self.pending = bytearray()
+
+    def close(self):
+        self.flush()
+        for name, (dtype, shape) in self.columns.items():
+            with open(self._path(name), "r+b") as f:
+                f.write(self._header(dtype, shape, self.count))
+
+    def _path(self, name):
+        return os.path.join(self.directory, f"{name}.npy")
+
+    def _header(self, dtype, shape, count):
+        import numpy as np
+
+        descr = np.lib.format.dtype_to_descr(np.dtype(dtype))
+        header = repr({"descr": descr, "fortran_order": False, "shape": (count,) + shape})
+        header = header.ljust(NPY_HEADER_SIZE - 11) + "\n"
+        return b"\x93NUMPY\x01\x00" + struct.pack("<H", len(header)) + header.encode("latin1")
+
+
+def _layout_columns(view_class, prefix="", base=0):
+    # (name, big-endian dtype, byte offset, bitfield spec or None) for every leaf
+    # of a message, from the accessors of its generated view
+    columns = []
+    for name, accessor in view_class.__dict__.items():
+        if not isinstance(accessor, (scalarAccessor, arrayAccessor, bitfieldAccessor, messageAccessor)):
+            continue
+        offset = base + accessor.offset
+        if isinstance(accessor, scalarAccessor):
+            columns.append((prefix + name, ">" + accessor.format, offset, None))
+        elif isinstance(accessor, arrayAccessor):
+            columns.append((prefix + name, (accessor.item.format, (accessor.count,)), offset, None))
+        elif isinstance(accessor, bitfieldAccessor):
+            spec = (accessor.size, accessor.shift, accessor.mask)
+            columns.append((prefix + name, ("u1", (accessor.size,)), offset, spec))
+        elif isinstance(accessor, messageArrayAccessor):
+            nested = accessor.resolve()
+            for index in range(accessor.count):
+                columns += _layout_columns(nested, f"{prefix}{name}.{index}.", offset + index * nested.SIZE)
+        elif isinstance(accessor, messageAccessor):
+            columns += _layout_columns(accessor.resolve(), f"{prefix}{name}.", offset)
+    return columns
+
+
+def _extract_bitfield(raw, size, shift, mask):
+    # vectorized bitfieldAccessor.extract(): reverse each byte's bits, then read
+    # the group big-endian
+    import numpy as np
+
+    raw = np.frombuffer(BIT_REVERSE, dtype=np.uint8)[raw].astype(np.uint64)
+    value = np.zeros(len(raw), dtype=np.uint64)
+    for index in range(size):
+        value = (value << np.uint64(8)) | raw[:, index]
+    return (value >> np.uint64(shift)) & np.uint64(mask)
@@ -0,0 +1,147 @@
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import os
+
+from serializer.serializer import FRAME_HEADER, captureReader, messageRegistry
+
+# numpy is only imported by the functions that build record arrays
+
+# consecutive valid frame headers needed before a worker trusts an offset as a frame boundary
+SYNC_FRAMES = 4
+
+
+def map_capture(path, registry: messageRegistry, function, workers=None, chunks=None):
+    """Calls function(capture, frames) for every chunk of a capture file in a pool
+    of worker processes and returns the results in file order. frames iterates
+    the (word_id, offset, length) of the chunk's frames, see captureReader.frames().
+    Every worker memory maps the file itself, so only chunk boundaries and results
+    cross process boundaries. function must be picklable, i.e. defined at module level.
+
+    chunks are (start, end) byte ranges covering the file, four per worker by
+    default. They don't need to be aligned: each worker finds the first frame in
+    its range by checking that SYNC_FRAMES frame headers in a row match the
+    registry's size table, and keeps going until the first frame that starts
+    past its range. Every chunk's first frame is then checked against where the
+    previous chunk stopped, and a chunk that synchronized on the wrong offset is
+    decoded again from the right one, so the results are always exact.
+    """
+    workers = workers or os.cpu_count() or 1
+    if chunks is None:
+        size = os.path.getsize(path)
+        step = max(-(-size // (workers * 4)), 1)
+        chunks = [(start, min(start + step, size)) for start in range(0, size, step)]
+    task = partial(_map_unaligned_chunk, path, registry, function)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        parts = list(executor.map(task, *zip(*chunks))) if chunks else []
+
+    results = []
+    expected = 0
+    for (_, end), (start, stop, result) in zip(chunks, parts):
+        if start != expected:
+            start, stop, result = _map_chunk(path, registry, function, expected, end)
+        results.append(result)
+        expected = stop
+    return results
+
+
+def _map_unaligned_chunk(path, registry, function, start, end):
+    # runs in a worker, returns (first frame offset, offset after the last frame, function's result)
+    with captureReader(path, registry) as capture:
+        start = _synchronize(capture, start, end)
+    if start is None:
+        return None, end, None
+    try:
+        return _map_chunk(path, registry, function, start, end)
+    except ValueError:
+        # raised when start was synchronized wrongly, the parent redoes the chunk
+        return None, end, None
+
+
+def _map_chunk(path, registry, function, start, end):
+    with captureReader(path, registry) as capture:
+        stop = [start]
+
+        def frames():
+            for frame in capture.frames(start, end):
+                stop[0] = frame[1] + frame[2]
+                yield frame
+
+        iterator = frames()
+        result = function(capture, iterator)
+        # the next chunk is checked against where this one really stops
+        for _ in iterator:
+            pass
+        return start, stop[0], result
+
+
+def _synchronize(capture, start, end):
+    # first offset in [start, end) that begins a chain of valid frames
+    buffer = capture.buffer
+    size = len(buffer)
+    sizes = capture.registry.sizes
+    header = FRAME_HEADER.size
+    for candidate in range(start, min(end, size)):
+        offset = candidate
+        for _ in range(SYNC_FRAMES):
+            if offset == size:
+                break
+            if offset + header > size:
+                offset = None
+                break
+            word_id, length = FRAME_HEADER.unpack_from(buffer, offset)
+            if word_id >= len(sizes) or length != sizes[word_id]:
+                offset = None
+                break
+            offset += header + length
+        if offset is not None and offset <= size:
+            return candidate
+    return None
+
+
+def decode_capture(path, registry: messageRegistry, word_id: int, workers=None, chunks=None) -> "np.recarray":
+    """Decodes every message of one word ID in a capture file, in parallel, into a
+    single record array in file order. See decode_batch() for the layout."""
+    import numpy as np
+
+    message = registry.classes[word_id]
+    parts = map_capture(path, registry, partial(_decode_chunk, word_id), workers, chunks)
+    # concatenate() would otherwise canonicalize the big-endian DTYPE to native byte order
+    return np.concatenate([np.empty(0, dtype=message.DTYPE)] + parts, dtype=message.DTYPE).view(np.recarray)
+
+
+def _decode_chunk(word_id, capture, frames):
+    import numpy as np
+
+    message = capture.registry.classes[word_id]
+    size = message.SIZE
+    offsets = []
+    for frame_id, offset, length in frames:
+        if frame_id == word_id:
+            if length != size:
+                raise ValueError(f"Frame at offset {offset} is {length} bytes, {message.__name__} is {size} bytes")
+            offsets.append(offset)
+    if not offsets:
+        return np.empty(0, dtype=message.DTYPE)
+    data = np.frombuffer(capture.buffer, dtype=np.uint8)
+    # gathering every payload with one fancy index copies them out of the mapping
+    records = data[np.asarray(offsets, dtype=np.int64)[:, None] + np.arange(size)]
+    # the mapping can't be closed while numpy still views it
+    del data
+    return records.view(message.DTYPE).reshape(-1)
+
+
+def count_capture(path, registry: messageRegistry, workers=None, chunks=None):
+    """Returns the number of frames of every word ID in a capture file, as a
+    list indexed by word ID. Frames with unknown word IDs are not counted."""
+    counts = [0] * len(registry)
+    for part in map_capture(path, registry, _count_chunk, workers, chunks):
+        counts = [total + count for total, count in zip(counts, part)]
+    return counts
+
+
+def _count_chunk(capture, frames):
+    counts = [0] * len(capture.registry)
+    for word_id, _, _ in frames:
+        if word_id < len(counts):
+            counts[word_id] += 1
+    return counts
@@ -0,0 +1,84 @@
+import asyncio
+
+from serializer.serializer import messageRegistry
+
+
+class _messageDelivery:
+    """Hands decoded batches to a handler callback, or queues them for async
+    iteration when no handler is given."""
+
+    def __init__(self, registry: messageRegistry, handler=None):
+        self.registry = registry
+        self.handler = handler
+        self.transport = None
+        self._queue = asyncio.Queue() if handler is None else None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def connection_lost(self, exc):
+        if self._queue is not None:
+            self._queue.put_nowait(None)
+
+    def __aiter__(self):
+        return self.messages()
+
+    async def messages(self):
+        """Yields decoded messages until the connection is lost. Only available
+        when the protocol was created without a handler."""
+        if self._queue is None:
+            raise RuntimeError("Messages are delivered to the handler callback")
+        while True:
+            batch = await self._queue.get()
+            if batch is None:
+                return
+            for msg in batch:
+                yield msg
+
+
+class messageStreamProtocol(_messageDelivery, asyncio.Protocol):
+    """asyncio.Protocol for a stream of encode_frame() frames.
+
+    Incoming chunks are appended to one growing buffer. Every complete frame in
+    it is decoded in a single pass with the registry's size table, and the
+    partial frame at the end is kept for the next chunk. Each batch is passed
+    to handler(messages) as a list, or queued for `async for msg in protocol`.
+
+        loop.create_connection(lambda: messageStreamProtocol(REGISTRY, handler), host, port)
+    """
+
+    def __init__(self, registry: messageRegistry, handler=None):
+        super().__init__(registry, handler)
+        self._buffer = bytearray()
+
+    def data_received(self, data):
+        buffer = self._buffer
+        buffer += data
+        messages, consumed = self.registry.decode_frames(buffer)
+        # deleting from the front of a bytearray doesn't move the remaining bytes
+        del buffer[:consumed]
+        if messages:
+            if self._queue is None:
+                self.handler(messages)
+            else:
+                self._queue.put_nowait(messages)
+
+    def eof_received(self):
+        return False
+
+
+class messageDatagramProtocol(_messageDelivery, asyncio.DatagramProtocol):
+    """asyncio.DatagramProtocol where every datagram holds one or more complete
+    encode_frame() frames. Each datagram's messages are passed to
+    handler(messages, addr), or queued for `async for msg in protocol`.
+
+        loop.create_datagram_endpoint(lambda: messageDatagramProtocol(REGISTRY, handler), local_addr=addr)
+    """
+
+    def datagram_received(self, data, addr):
+        messages, _ = self.registry.decode_frames(data)
+        if messages:
+            if self._queue is None:
+                self.handler(messages, addr)
+            else:
+                self._queue.put_nowait(messages)
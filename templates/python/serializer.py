@@ -1,7 +1,80 @@
 from abc import ABC, abstractmethod
-from bitstring import BitStream
+import array
+import ctypes
+import json
+import mmap
+import struct
+import sys
+
+# numpy and bitstring are imported inside the methods that need them, so decoding
+# messages only ever loads the standard library
+
+# BIT_REVERSE[b] is the byte b with its bit order reversed, for use with bytes.translate()
+BIT_REVERSE = bytes(int(f"{b:08b}"[::-1], 2) for b in range(256))
+
+
+def _array_typecode(typecodes: str, itemsize: int) -> str:
+    for typecode in typecodes:
+        if array.array(typecode).itemsize == itemsize:
+            return typecode
+    raise ImportError(f"None of the array type codes {typecodes} has {itemsize} byte items")
+
+
+# the item size of "I" and "i" follows the platform's C int, so 32 bit array fields use
+# whichever of int and long is 4 bytes here
+U32_TYPECODE = _array_typecode("IL", 4)
+I32_TYPECODE = _array_typecode("il", 4)
+
+# builtin array fields are converted to and from their big-endian wire bytes in one
+# bulk operation. The byte order check happens once here rather than on every call.
+# The struct "s" format pads or truncates a block silently, so the generated code
+# passes each array's count and a wrong length fails here instead.
+if sys.byteorder == "little":
+
+    def pack_array(typecode: str, values, count=None) -> bytes:
+        """Returns the big-endian bytes of values as an array of typecode. Raises
+        ValueError unless there are exactly count values, when count is given."""
+        if count is not None and len(values) != count:
+            raise ValueError(f"Array has {len(values)} values, expected {count}")
+        data = array.array(typecode, values)
+        data.byteswap()
+        return data.tobytes()
+
+    def unpack_array(typecode: str, data: bytes) -> array.array:
+        """Returns the big-endian bytes in data as an array of typecode."""
+        values = array.array(typecode, data)
+        values.byteswap()
+        return values
+
+else:
+
+    def pack_array(typecode: str, values, count=None) -> bytes:
+        """Returns the big-endian bytes of values as an array of typecode. Raises
+        ValueError unless there are exactly count values, when count is given."""
+        if count is not None and len(values) != count:
+            raise ValueError(f"Array has {len(values)} values, expected {count}")
+        return array.array(typecode, values).tobytes()
+
+    def unpack_array(typecode: str, data: bytes) -> array.array:
+        """Returns the big-endian bytes in data as an array of typecode."""
+        return array.array(typecode, data)
+
+
+def pack_messages(messages, count: int) -> bytes:
+    """Returns the concatenated serializations of a message array. Raises
+    ValueError unless there are exactly count messages."""
+    if len(messages) != count:
+        raise ValueError(f"Array has {len(messages)} values, expected {count}")
+    return b"".join([message.serialize() for message in messages])
+
 
 class serializableMessage(ABC):
+    # empty so generated messages can opt into __slots__ without inheriting a __dict__
+    __slots__ = ()
+    SIZE = 0
+    # ctypes.BigEndianStructure with the wire layout, None for messages with bitfields
+    CSTRUCT = None
+
     @abstractmethod
     def serialize(self) -> bytes:
         pass
@@ -9,10 +82,822 @@ class serializableMessage(ABC):
     @abstractmethod
     def deserialize(self, data) -> None:
         pass
-    
-    def reverse_bits(self, bits: BitStream) -> BitStream:
+
+    def serialize_into(self, buf, offset=0) -> int:
+        """Serializes the message into a preallocated bytearray or memoryview at
+        offset and returns the number of bytes written."""
+        data = self.serialize()
+        memoryview(buf)[offset : offset + len(data)] = data
+        return len(data)
+
+    def __reduce__(self):
+        # pickles as the class reference and the SIZE wire bytes instead of every
+        # attribute, extra attributes on messages without __slots__ are not kept
+        return _unpickle_message, (type(self), self.serialize())
+
+    def deserialize_from(self, buffer, offset=0) -> int:
+        """De-serializes the message at offset in any buffer protocol object
+        (bytes, bytearray, memoryview, mmap) and returns the number of bytes consumed."""
+        self.deserialize(memoryview(buffer)[offset : offset + self.SIZE])
+        return self.SIZE
+
+    @classmethod
+    def decode_batch(cls, buffer, count=-1, offset=0) -> "np.recarray":
+        """Decodes a contiguous run of count messages of this type (all of them
+        by default) into a record array that views buffer without copying it.
+        Nested messages become sub-records and arrays become subarray fields."""
+        import numpy as np
+
+        return np.frombuffer(buffer, dtype=cls.DTYPE, count=count, offset=offset).view(np.recarray)
+
+    @classmethod
+    def decode_fields(cls, buffer, fields, offset=0) -> tuple:
+        """Decodes only the named fields of the message at offset in buffer and
+        returns their values in the order given. Nested fields are named with
+        dots, array elements by index, e.g. ("lightStatuses.1.broken", "test").
+        A decoder that skips every other field by offset is compiled the first
+        time a set of fields is used and cached."""
+        fields = tuple(fields)
+        try:
+            decoder = _FIELD_DECODERS[cls, fields]
+        except KeyError:
+            decoder = _FIELD_DECODERS[cls, fields] = _compile_field_decoder(cls.VIEW, fields)
+        return decoder(buffer, offset)
+
+    @classmethod
+    def encode_batch(cls, columns) -> bytes:
+        """Encodes many messages of this type in one tobytes() call. columns is
+        either a record/structured array or a dict of per-field arrays (nested
+        messages may be given as nested dicts). Fields that are left out keep
+        the message's default values. The result matches concatenating each
+        message's serialize() output."""
+        import numpy as np
+
+        batch = np.empty(_column_length(columns), dtype=cls.DTYPE)
+        batch[:] = np.frombuffer(cls().serialize(), dtype=cls.DTYPE)[0]
+        _assign_columns(batch, columns)
+        return batch.tobytes()
+
+    def validate(self) -> None:
+        """Raises ValueError if a field is out of range for its wire type or an
+        array doesn't have its declared length."""
+
+    @classmethod
+    def set_validation(cls, enabled=True) -> None:
+        """Turns range checking of this message on or off. While it is on,
+        serialize() and serialize_into() call validate() first, and encode_batch()
+        checks every column's min and max against its dtype. The checked versions
+        are swapped in as methods, so while it is off encoding runs without a
+        single extra branch."""
+        unchecked = _UNCHECKED_METHODS.pop(cls, None)
+        if unchecked is not None:
+            for name, method in unchecked.items():
+                if method is None:
+                    delattr(cls, name)
+                else:
+                    setattr(cls, name, method)
+        if not enabled:
+            return
+
+        # serialize_into() inherited from serializableMessage already goes through serialize()
+        names = ["serialize", "serialize_into"] if "serialize_into" in cls.__dict__ else ["serialize"]
+        unchecked = _UNCHECKED_METHODS[cls] = {name: cls.__dict__[name] for name in names}
+        unchecked["encode_batch"] = cls.__dict__.get("encode_batch")
+        for name in names:
+            setattr(cls, name, _checked_method(unchecked[name]))
+        setattr(cls, "encode_batch", classmethod(_checked_encode_batch(cls.encode_batch.__func__)))
+
+    def reverse_bits(self, bits: "BitStream") -> "BitStream":
         """Reverses the bits of every byte in the bitstream."""
+        from bitstring import BitStream
+
         reversed_bits = BitStream()
         for byte in bits.cut(8):
             reversed_bits.append(byte[::-1])
-        return reversed_bits
\ No newline at end of file
+        return reversed_bits
+
+
+# the methods set_validation() replaced, by message class
+_UNCHECKED_METHODS = {}
+
+
+def _checked_method(method):
+    def checked(self, *args, **kwargs):
+        self.validate()
+        return method(self, *args, **kwargs)
+
+    checked.__name__ = method.__name__
+    checked.__doc__ = method.__doc__
+    return checked
+
+
+def _checked_encode_batch(function):
+    def encode_batch(cls, columns) -> bytes:
+        _check_columns(cls.__name__, cls.DTYPE, columns)
+        return function(cls, columns)
+
+    encode_batch.__doc__ = function.__doc__
+    return encode_batch
+
+
+def _check_columns(name, dtype, columns):
+    import numpy as np
+
+    names = columns.keys() if isinstance(columns, dict) else columns.dtype.names
+    for field in names:
+        column = columns[field]
+        base = dtype[field].base
+        if base.names:
+            _check_columns(f"{name}.{field}", base, column)
+            continue
+        column = np.asarray(column)
+        if column.size == 0 or base.kind not in "iuf":
+            continue
+        info = np.iinfo(base) if base.kind in "iu" else np.finfo(base)
+        # min()/max() are NaN for columns holding NaN, which compare False and pass
+        low, high = column.min(), column.max()
+        if low < info.min or high > info.max:
+            raise ValueError(f"{name}.{field} has values in [{low}, {high}], out of range [{info.min}, {info.max}]")
+
+
+def _unpickle_message(cls, data):
+    msg = cls()
+    msg.deserialize_from(data)
+    return msg
+
+
+def _column_length(columns) -> int:
+    if isinstance(columns, dict):
+        return _column_length(next(iter(columns.values())))
+    return len(columns)
+
+
+def _assign_columns(batch, columns):
+    # assign by field name, structured assignment on its own would match fields by position
+    names = columns.keys() if isinstance(columns, dict) else columns.dtype.names
+    for name in names:
+        column = columns[name]
+        if isinstance(column, dict) or getattr(getattr(column, "dtype", None), "names", None):
+            _assign_columns(batch[name], column)
+        else:
+            batch[name] = column
+
+
+# compiled decode_fields() decoders by (message class, fields)
+_FIELD_DECODERS = {}
+
+
+def _compile_field_decoder(view_class, fields):
+    # every requested field becomes a member of one struct that starts at the first
+    # requested byte and skips everything between requested fields with pad bytes.
+    # A field inside another requested field (e.g. "inner" and "inner.id") is not a
+    # member of its own, it is unpacked from the enclosing member's raw bytes.
+    specs = [_field_spec(view_class, name) for name in fields]
+    if not specs:
+        raise ValueError("No fields requested")
+    size = lambda member: struct.calcsize(">" + member[1])
+    members = []
+    # enclosing fields sort ahead of the fields inside them
+    for member in sorted(set((offset, fmt) for offset, fmt, _ in specs), key=lambda member: (member[0], -size(member))):
+        if not members or member[0] + size(member) > members[-1][0] + size(members[-1]):
+            members.append(member)
+    start = members[0][0]
+    layout = ">"
+    position = start
+    for offset, fmt in members:
+        if offset < position:
+            raise ValueError(f"Requested fields of {view_class.MESSAGE.__name__} overlap: {fields}")
+        layout += f"{offset - position}x{fmt}" if offset > position else fmt
+        position = offset + struct.calcsize(">" + fmt)
+    unpack = struct.Struct(layout).unpack_from
+
+    if [(offset, fmt) for offset, fmt, _ in specs] == members and all(convert is None for _, _, convert in specs):
+        # plain scalars in wire order come straight out of the struct
+        def decoder(buffer, offset=0):
+            return unpack(buffer, offset + start)
+
+    else:
+        getters = [_field_getter(members, offset, fmt, convert) for offset, fmt, convert in specs]
+
+        def decoder(buffer, offset=0):
+            values = unpack(buffer, offset + start)
+            return tuple([getter(values) for getter in getters])
+
+    return decoder
+
+
+def _field_getter(members, offset, fmt, convert):
+    # returns a function taking the decoder's unpacked values to one field's value
+    if (offset, fmt) in members:
+        i = members.index((offset, fmt))
+        if convert is None:
+            return lambda values: values[i]
+        return lambda values: convert(values[i])
+
+    # inside the last member that starts at or before it
+    i = max(index for index, (member, _) in enumerate(members) if member <= offset)
+    unpack = struct.Struct(">" + fmt).unpack_from
+    relative = offset - members[i][0]
+    if convert is None:
+        return lambda values: unpack(values[i], relative)[0]
+    return lambda values: convert(unpack(values[i], relative)[0])
+
+
+def _field_spec(view_class, name):
+    # (byte offset, struct format, convert) of a dotted field name. convert turns the
+    # unpacked raw value into the field's value and is None for plain scalars.
+    offset = 0
+    parts = name.split(".")
+    while parts:
+        part = parts.pop(0)
+        accessor = view_class.__dict__.get(part)
+        if accessor is None:
+            raise ValueError(f"{view_class.MESSAGE.__name__} has no field {part!r}")
+        offset += accessor.offset
+
+        if isinstance(accessor, scalarAccessor):
+            if not parts:
+                return offset, accessor.format, None
+        elif isinstance(accessor, bitfieldAccessor):
+            if not parts:
+                return offset, f"{accessor.size}s", accessor.extract
+        elif isinstance(accessor, arrayAccessor):
+            item = accessor.item
+            if not parts:
+                typecode = item.format[1:]
+                return offset, f"{accessor.count * item.size}s", lambda raw: unpack_array(typecode, raw)
+            index = _field_index(view_class, part, parts.pop(0), accessor.count)
+            if not parts:
+                return offset + index * item.size, item.format[1:], None
+        else:
+            nested = accessor.resolve()
+            if isinstance(accessor, messageArrayAccessor):
+                if not parts:
+                    count = accessor.count
+                    return offset, f"{count * nested.SIZE}s", lambda raw: _decode_messages(nested, raw, count)
+                offset += _field_index(view_class, part, parts.pop(0), accessor.count) * nested.SIZE
+            if not parts:
+                return offset, f"{nested.SIZE}s", lambda raw: _decode_messages(nested, raw, 1)[0]
+            view_class = nested
+            continue
+        raise ValueError(f"{view_class.MESSAGE.__name__}.{part} has no field {parts[0]!r}")
+
+
+def _field_index(view_class, name, index, count):
+    if not index.isdigit() or int(index) >= count:
+        raise ValueError(f"{view_class.MESSAGE.__name__}.{name} has no element {index!r}")
+    return int(index)
+
+
+def _decode_messages(view_class, raw, count):
+    messages = []
+    for index in range(count):
+        msg = view_class.MESSAGE()
+        msg.deserialize_from(raw, index * view_class.SIZE)
+        messages.append(msg)
+    return messages
+
+
+# optional compact frame header placed in front of a serialized message: word ID, payload length
+FRAME_HEADER = struct.Struct(">HH")
+
+
+class messageRegistry:
+    """Maps word IDs to generated message classes through dense lists, so
+    demultiplexing a frame is a single indexed lookup. messages must be given in
+    word ID order, the generated module builds its REGISTRY this way."""
+
+    def __init__(self, messages):
+        self.classes = list(messages)
+        self.sizes = [message.SIZE for message in self.classes]
+        for word_id, message in enumerate(self.classes):
+            if message.WORD_ID != word_id:
+                raise ValueError(f"{message.__name__} has word ID {message.WORD_ID}, expected {word_id}")
+
+    def __len__(self):
+        return len(self.classes)
+
+    def new_message(self, word_id: int) -> serializableMessage:
+        """Returns a default constructed message for word_id."""
+        return self.classes[word_id]()
+
+    def set_validation(self, enabled=True) -> None:
+        """Turns range checking on or off for every registered message, see
+        serializableMessage.set_validation()."""
+        for message in self.classes:
+            message.set_validation(enabled)
+
+    def encode_frame(self, msg: serializableMessage) -> bytes:
+        """Serializes msg behind a FRAME_HEADER."""
+        return FRAME_HEADER.pack(msg.WORD_ID, msg.SIZE) + msg.serialize()
+
+    def encode_frame_into(self, msg: serializableMessage, buf, offset=0) -> int:
+        """Writes msg and its FRAME_HEADER into buf at offset, returning the bytes written."""
+        FRAME_HEADER.pack_into(buf, offset, msg.WORD_ID, msg.SIZE)
+        return FRAME_HEADER.size + msg.serialize_into(buf, offset + FRAME_HEADER.size)
+
+    def decode_frames(self, buffer, offset=0):
+        """Decodes every complete frame from offset onwards. Returns the list of
+        messages and the offset just past the last complete frame, so a partial
+        frame at the end of buffer can be completed later. Frames with an
+        unknown word ID or a length that doesn't match are skipped."""
+        classes = self.classes
+        sizes = self.sizes
+        count = len(classes)
+        unpack_header = FRAME_HEADER.unpack_from
+        header = FRAME_HEADER.size
+        end = len(buffer)
+        messages = []
+        while end - offset >= header:
+            word_id, length = unpack_header(buffer, offset)
+            if end - offset - header < length:
+                break
+            if word_id < count and length == sizes[word_id]:
+                msg = classes[word_id]()
+                msg.deserialize_from(buffer, offset + header)
+                messages.append(msg)
+            offset += header + length
+        return messages, offset
+
+    def decode_any(self, buffer, offset=0):
+        """Decodes the frame at offset in buffer, whatever its message type.
+        Returns the message and the number of bytes consumed, header included."""
+        word_id, length = FRAME_HEADER.unpack_from(buffer, offset)
+        if word_id >= len(self.classes):
+            raise ValueError(f"Unknown word ID {word_id} at offset {offset}")
+        if length != self.sizes[word_id]:
+            raise ValueError(
+                f"Frame at offset {offset} is {length} bytes, "
+                f"{self.classes[word_id].__name__} is {self.sizes[word_id]} bytes"
+            )
+        msg = self.classes[word_id]()
+        msg.deserialize_from(buffer, offset + FRAME_HEADER.size)
+        return msg, FRAME_HEADER.size + length
+
+
+class jsonLinesEncoder:
+    """Converts messages to and from JSON lines. Each line is one object holding
+    the message's word ID, its class name and its to_dict() fields:
+
+        {"word_id": 2, "type": "LED.ledStatusWord", "data": {...}}
+    """
+
+    def __init__(self, registry: messageRegistry):
+        self.registry = registry
+        # the fixed start of every line, by word ID
+        self._prefixes = [
+            f'{{"word_id": {word_id}, "type": "{message.__qualname__}", "data": '
+            for word_id, message in enumerate(registry.classes)
+        ]
+        self._dumps = json.JSONEncoder(check_circular=False).encode
+
+    def encode(self, msg: serializableMessage) -> str:
+        """Returns msg as one JSON line, including the newline."""
+        return self._prefixes[msg.WORD_ID] + self._dumps(msg.to_dict()) + "}\n"
+
+    def decode(self, line) -> serializableMessage:
+        """Builds the message held by one JSON line."""
+        record = json.loads(line)
+        return self.registry.classes[record["word_id"]].from_dict(record["data"])
+
+    def write(self, messages, file) -> int:
+        """Writes every message of an iterable, e.g. captureReader.messages() or a
+        messageStreamProtocol, to a text file and returns how many were written."""
+        prefixes = self._prefixes
+        dumps = self._dumps
+        lines = []
+        count = 0
+        for msg in messages:
+            lines.append(prefixes[msg.WORD_ID] + dumps(msg.to_dict()) + "}\n")
+            # written in batches so large captures don't build one huge string
+            if len(lines) == 4096:
+                file.writelines(lines)
+                count += len(lines)
+                lines.clear()
+        file.writelines(lines)
+        return count + len(lines)
+
+    def read(self, file):
+        """Lazily yields the messages of a JSON lines text file."""
+        for line in file:
+            if line.strip():
+                yield self.decode(line)
+
+
+class captureReader:
+    """Streams the frames of a capture file, a file of messages written back to
+    back with encode_frame(). The file is memory mapped and walked with the
+    registry's size table, so memory use doesn't grow with the file and frames
+    are decoded straight out of the mapping without slicing or copying it.
+
+    Frames with a word ID the registry doesn't know are skipped using their
+    header's length. Use as a context manager, or call close().
+    """
+
+    def __init__(self, path, registry: messageRegistry):
+        self.registry = registry
+        self._file = open(path, "rb")
+        if self._file.seek(0, 2) == 0:
+            # mmap refuses empty files
+            self.buffer = b""
+        else:
+            self.buffer = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            if hasattr(mmap, "MADV_SEQUENTIAL"):
+                self.buffer.madvise(mmap.MADV_SEQUENTIAL)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __iter__(self):
+        return self.messages()
+
+    def close(self):
+        if isinstance(self.buffer, mmap.mmap):
+            self.buffer.close()
+        self._file.close()
+
+    def frames(self, start=0, end=None):
+        """Yields (word_id, offset, length) for every frame, where offset is the
+        start of the message payload in self.buffer. Nothing is decoded. start and
+        end limit the walk to the frames that start in a byte range, start must be
+        at a frame boundary."""
+        buffer = self.buffer
+        size = len(buffer)
+        end = size if end is None else min(end, size)
+        header = FRAME_HEADER.size
+        offset = start
+        while offset < end:
+            if offset + header > size:
+                raise ValueError(f"Truncated frame header at offset {offset}")
+            word_id, length = FRAME_HEADER.unpack_from(buffer, offset)
+            offset += header
+            if offset + length > size:
+                raise ValueError(f"Truncated {length} byte frame at offset {offset - header}")
+            yield word_id, offset, length
+            offset += length
+
+    def messages(self, word_id=None):
+        """Lazily yields decoded messages, optionally only those of one word ID."""
+        classes = self.registry.classes
+        sizes = self.registry.sizes
+        for frame_id, offset, length in self.frames():
+            if frame_id >= len(classes) or (word_id is not None and frame_id != word_id):
+                continue
+            if length != sizes[frame_id]:
+                raise ValueError(
+                    f"Frame at offset {offset - FRAME_HEADER.size} is {length} bytes, "
+                    f"{classes[frame_id].__name__} is {sizes[frame_id]} bytes"
+                )
+            msg = classes[frame_id]()
+            msg.deserialize_from(self.buffer, offset)
+            yield msg
+
+    def views(self, word_id=None):
+        """Like messages() but yields a message view per frame, so only the fields
+        that are actually read get decoded."""
+        classes = self.registry.classes
+        sizes = self.registry.sizes
+        for frame_id, offset, length in self.frames():
+            if frame_id >= len(classes) or (word_id is not None and frame_id != word_id):
+                continue
+            if length != sizes[frame_id]:
+                raise ValueError(
+                    f"Frame at offset {offset - FRAME_HEADER.size} is {length} bytes, "
+                    f"{classes[frame_id].__name__} is {sizes[frame_id]} bytes"
+                )
+            yield classes[frame_id].VIEW(self.buffer, offset)
+
+
+class lazyDtype:
+    """Class attribute holding a message's numpy dtype description. numpy is only
+    imported, and the dtype built, the first time the attribute is read."""
+
+    def __init__(self, spec):
+        self.spec = spec
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, instance, owner):
+        import numpy as np
+
+        dtype = np.dtype(self.spec)
+        # replace the descriptor so later lookups are plain attribute reads
+        setattr(owner, self.name, dtype)
+        return dtype
+
+
+def bigEndianStructure(name, fields):
+    """Creates a packed ctypes.BigEndianStructure, used for messages nested in a
+    generated <Message>Struct."""
+    return type(name, (ctypes.BigEndianStructure,), {"_pack_": 1, "_fields_": fields})
+
+
+class messageView:
+    """Base class of the generated <Message>View classes. A view decodes nothing
+    up front: it holds a buffer and the offset of a message inside it, and each
+    field is unpacked from its fixed byte offset when it is read. Nested
+    messages and arrays are returned as further views of the same buffer.
+
+    The buffer is stored as given, so keep it alive (and unchanged, unless the
+    view should see the changes) for as long as the view is used.
+    """
+
+    __slots__ = ("_buffer", "_offset")
+    MESSAGE = serializableMessage
+    SIZE = 0
+
+    def __init__(self, buffer, offset=0):
+        self._buffer = buffer
+        self._offset = offset
+
+    def decode(self) -> serializableMessage:
+        """Returns a fully decoded copy of the viewed message."""
+        msg = self.MESSAGE()
+        msg.deserialize_from(self._buffer, self._offset)
+        return msg
+
+    def tobytes(self) -> bytes:
+        """Returns the viewed message's wire bytes."""
+        return bytes(memoryview(self._buffer)[self._offset : self._offset + self.SIZE])
+
+
+class scalarAccessor:
+    """View field holding one builtin value."""
+
+    __slots__ = ("format", "unpack", "offset")
+
+    def __init__(self, fmt: str, offset: int):
+        self.format = fmt[1:]
+        self.unpack = struct.Struct(fmt).unpack_from
+        self.offset = offset
+
+    def __get__(self, view, owner):
+        if view is None:
+            return self
+        return self.unpack(view._buffer, view._offset + self.offset)[0]
+
+
+class bitfieldAccessor:
+    """View field holding one member of a bitfield group, see the struct backend's
+    bitfield packing for the bit order."""
+
+    __slots__ = ("offset", "size", "shift", "mask")
+
+    def __init__(self, offset: int, size: int, shift: int, mask: int):
+        self.offset = offset
+        self.size = size
+        self.shift = shift
+        self.mask = mask
+
+    def __get__(self, view, owner):
+        if view is None:
+            return self
+        start = view._offset + self.offset
+        return self.extract(bytes(view._buffer[start : start + self.size]))
+
+    def extract(self, data: bytes) -> int:
+        """Returns the member's value from the raw bytes of its bitfield group."""
+        return int.from_bytes(data.translate(BIT_REVERSE), "big") >> self.shift & self.mask
+
+
+class arrayAccessor:
+    """View field holding an array of builtin values, read as an arrayView."""
+
+    __slots__ = ("item", "offset", "count")
+
+    def __init__(self, fmt: str, offset: int, count: int):
+        self.item = struct.Struct(fmt)
+        self.offset = offset
+        self.count = count
+
+    def __get__(self, view, owner):
+        if view is None:
+            return self
+        return arrayView(view._buffer, view._offset + self.offset, self.item, self.count)
+
+
+class messageAccessor:
+    """View field holding a nested message, read as that message's view. view_class
+    is a callable returning the view class, it is resolved on first access."""
+
+    __slots__ = ("view_class", "offset")
+
+    def __init__(self, view_class, offset: int):
+        self.view_class = view_class
+        self.offset = offset
+
+    def resolve(self):
+        """Returns the nested message's view class."""
+        if not isinstance(self.view_class, type):
+            self.view_class = self.view_class()
+        return self.view_class
+
+    def __get__(self, view, owner):
+        if view is None:
+            return self
+        if not isinstance(self.view_class, type):
+            self.view_class = self.view_class()
+        return self.view_class(view._buffer, view._offset + self.offset)
+
+
+class messageArrayAccessor(messageAccessor):
+    """View field holding an array of nested messages, read as a messageArrayView."""
+
+    __slots__ = ("count",)
+
+    def __init__(self, view_class, offset: int, count: int):
+        super().__init__(view_class, offset)
+        self.count = count
+
+    def __get__(self, view, owner):
+        if view is None:
+            return self
+        if not isinstance(self.view_class, type):
+            self.view_class = self.view_class()
+        return messageArrayView(view._buffer, view._offset + self.offset, self.view_class, self.count)
+
+
+class _sequenceView:
+    __slots__ = ("_buffer", "_offset", "_count")
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        for index in range(self._count):
+            yield self[index]
+
+    def _index(self, index: int) -> int:
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("view index out of range")
+        return index
+
+
+class arrayView(_sequenceView):
+    """Lazily decoded array of builtin values inside a buffer."""
+
+    __slots__ = ("_item",)
+
+    def __init__(self, buffer, offset: int, item: struct.Struct, count: int):
+        self._buffer = buffer
+        self._offset = offset
+        self._item = item
+        self._count = count
+
+    def __getitem__(self, index: int):
+        index = self._index(index)
+        return self._item.unpack_from(self._buffer, self._offset + index * self._item.size)[0]
+
+    def tolist(self) -> list:
+        """Decodes every element in one call."""
+        fmt = self._item.format
+        return list(struct.unpack_from(f"{fmt[0]}{self._count}{fmt[1:]}", self._buffer, self._offset))
+
+
+class messageArrayView(_sequenceView):
+    """Array of nested messages inside a buffer, indexing returns a view."""
+
+    __slots__ = ("_view_class",)
+
+    def __init__(self, buffer, offset: int, view_class, count: int):
+        self._buffer = buffer
+        self._offset = offset
+        self._view_class = view_class
+        self._count = count
+
+    def __getitem__(self, index: int) -> messageView:
+        index = self._index(index)
+        return self._view_class(self._buffer, self._offset + index * self._view_class.SIZE)
+
+
+class deltaEncoder:
+    """Delta encodes a stream of messages of one type against the last message sent.
+    Each delta is a bitmap with a bit per top level field (first field in the most
+    significant bit of the first byte), followed by the wire bytes of the fields
+    that changed, in order. Nested messages, arrays and bitfield groups are compared
+    and sent whole. A key frame has every bit set and carries the full message.
+
+    The first message is always a key frame, and so is every key_interval-th
+    message after it when key_interval is set, so a decoder that joins late or
+    loses a delta resynchronizes. The C++ deltaEncoder produces the same bytes.
+    """
+
+    def __init__(self, message, key_interval: int = 0):
+        self.message = message
+        self.key_interval = key_interval
+        self._offsets = message.FIELD_OFFSETS
+        self._fields = len(self._offsets) - 1
+        self._bitmap_size = (self._fields + 7) // 8
+        self._key = _key_bitmap(self._fields)
+        self._baseline = None
+        self._since_key = 0
+
+    def key_frame(self) -> None:
+        """Makes the next delta a key frame."""
+        self._baseline = None
+
+    def encode(self, msg) -> bytes:
+        """Returns the delta of msg against the previously encoded message."""
+        current = msg.serialize()
+        baseline = self._baseline
+        self._baseline = current
+        self._since_key += 1
+        if baseline is None or (self.key_interval and self._since_key >= self.key_interval):
+            self._since_key = 0
+            return self._key.to_bytes(self._bitmap_size, "big") + current
+        if current == baseline:
+            return bytes(self._bitmap_size)
+
+        offsets = self._offsets
+        bit = 1 << (self._bitmap_size * 8 - 1)
+        bitmap = 0
+        changed = []
+        for index in range(self._fields):
+            start = offsets[index]
+            end = offsets[index + 1]
+            field = current[start:end]
+            if field != baseline[start:end]:
+                bitmap |= bit >> index
+                changed.append(field)
+        return bitmap.to_bytes(self._bitmap_size, "big") + b"".join(changed)
+
+
+class deltaDecoder:
+    """Applies the deltas of a deltaEncoder onto a baseline of the last message."""
+
+    def __init__(self, message):
+        self.message = message
+        self._offsets = message.FIELD_OFFSETS
+        self._fields = len(self._offsets) - 1
+        self._bitmap_size = (self._fields + 7) // 8
+        self._key = _key_bitmap(self._fields)
+        self._baseline = None
+
+    @property
+    def synchronized(self) -> bool:
+        """True once a key frame has been received."""
+        return self._baseline is not None
+
+    def decode(self, data, offset=0):
+        """Applies the delta at offset in data. Returns the resulting message and
+        the number of bytes consumed. Raises ValueError for a delta that arrives
+        before the first key frame."""
+        bitmap = int.from_bytes(data[offset : offset + self._bitmap_size], "big")
+        position = offset + self._bitmap_size
+        if bitmap == self._key:
+            self._baseline = bytearray(data[position : position + self.message.SIZE])
+            position += self.message.SIZE
+        elif self._baseline is None:
+            raise ValueError(f"{self.message.__name__} delta received before a key frame")
+        else:
+            offsets = self._offsets
+            baseline = self._baseline
+            bit = 1 << (self._bitmap_size * 8 - 1)
+            for index in range(self._fields):
+                if bitmap & (bit >> index):
+                    start = offsets[index]
+                    end = offsets[index + 1]
+                    baseline[start:end] = data[position : position + end - start]
+                    position += end - start
+        msg = self.message()
+        msg.deserialize_from(self._baseline)
+        return msg, position - offset
+
+
+def _key_bitmap(fields):
+    size = (fields + 7) // 8
+    return ((1 << fields) - 1) << (size * 8 - fields)
+
+
+class bufferPool:
+    """A free list of preallocated, fixed size bytearrays for serialize_into().
+
+    Size the pool from a message's SIZE, or from MAX_MESSAGE_SIZE to share one
+    pool between every message type. Buffers are recycled rather than freed, so
+    a steady encode loop performs no allocations once the pool is warm.
+    """
+
+    def __init__(self, size: int, count: int = 0):
+        self.size = size
+        self._free = [bytearray(size) for _ in range(count)]
+
+    def __len__(self):
+        return len(self._free)
+
+    def acquire(self) -> bytearray:
+        """Returns a free buffer, allocating a new one only if the pool is empty."""
+        if self._free:
+            return self._free.pop()
+        return bytearray(self.size)
+
+    def release(self, buf: bytearray) -> None:
+        """Returns a buffer obtained from acquire() to the pool."""
+        if len(buf) != self.size:
+            raise ValueError(f"Buffer of {len(buf)} bytes does not belong to a pool of {self.size} byte buffers")
+        self._free.append(buf)
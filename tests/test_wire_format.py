@@ -0,0 +1,311 @@
+"""
+Round-trip and cross-implementation tests of the wire format. A sample set of
+definitions with builtin arrays, nested messages, small (unrolled) and large
+(packed per element) message arrays and bitfield groups is generated with both
+python backends, and every implementation has to produce the same bytes: the
+struct backend, the bitstream backend, the runtime codecs and, when g++ is
+available, the C++ serializers through the ctypes bindings.
+"""
+
+import importlib.util
+import io
+import os
+import random
+import shutil
+import sys
+
+import pytest
+
+from message_serializer.code_generators import CtypesGenerator, pythonGenerator
+from message_serializer.directory import Directory
+from message_serializer.lexerConfig import BUILTINS, FLOAT_TYPES
+from message_serializer.parser import merge_adjacent_bitfields
+from message_serializer.python_config import STRUCT_UNROLL_LIMIT
+from message_serializer.runtime import codecRegistry
+
+DEFINITIONS = {
+    "light.icd": """
+CONSTANT BULB_COUNT u8 = 3
+
+MSG bulb -Doc "a light bulb"
+{
+    brightness u8 = 5
+    colorR u8
+    colorG u8
+}
+""",
+    "sensor.icd": """
+CONSTANT SAMPLE_COUNT u16 = 40
+
+STATE modes {
+    IDLE
+    RUN
+    FAULT
+}
+
+MSG point -Doc "a point"
+{
+    x i16
+    y i16
+    z f32
+}
+
+MSG telemetry -Doc "builtin scalars and arrays of every width"
+{
+    mode u8 = RUN
+    temperature f32
+    pressure f64
+    offset i16 = -3
+    samples u16[SAMPLE_COUNT]
+    counters i32[FAULT]
+    deltas i64[3]
+    totals u32[4]
+    levels f32[2]
+    weights f64[2]
+    raw i8[5]
+    stamp u64
+}
+
+MSG strip -Doc "nested messages and message arrays"
+{
+    bulbs bulb[BULB_COUNT]
+    points point[SAMPLE_COUNT]
+    origin point
+    connected u8
+}
+""",
+}
+
+# added to bulb after validation, the definition language has no bitfield syntax
+BITFIELDS = [
+    {"name": "powerOn", "type": "bitfield", "count": 1, "default_value": None, "line": 0},
+    {"name": "level", "type": "bitfield", "count": 3, "default_value": None, "line": 0},
+    {"name": "mode", "type": "bitfield", "count": 9, "default_value": None, "line": 0},
+]
+
+
+def _tree(directory, bitfields=True):
+    tree = Directory(str(directory)).validate()
+    for message in tree.message_iterator():
+        if bitfields and message["name"] == "bulb":
+            groups = merge_adjacent_bitfields([dict(field) for field in BITFIELDS])
+            for group in groups:
+                group["parent"] = message
+            message["fields"][1:1] = groups
+    return tree
+
+
+def _load(directory, name, file_name="message.py"):
+    # the generated module imports the serializer package copied next to it
+    if str(directory) not in sys.path:
+        sys.path.insert(0, str(directory))
+    spec = importlib.util.spec_from_file_location(name, os.path.join(directory, file_name))
+    module = importlib.util.module_from_spec(spec)
+    # registered so worker processes can unpickle the message classes
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture(scope="module")
+def definitions(tmp_path_factory):
+    directory = tmp_path_factory.mktemp("definitions")
+    for name, text in DEFINITIONS.items():
+        (directory / name).write_text(text)
+    return directory
+
+
+@pytest.fixture(scope="module")
+def generated(definitions, tmp_path_factory):
+    modules = {}
+    for backend in pythonGenerator.BACKENDS:
+        output = tmp_path_factory.mktemp(backend)
+        pythonGenerator(_tree(definitions), backend=backend).generate_source_files(str(output), "message")
+        modules[backend] = _load(output, f"message_{backend}")
+    return modules
+
+
+@pytest.fixture(scope="module")
+def codecs(definitions):
+    return codecRegistry.from_ast(_tree(definitions))
+
+
+def _random_values(schema, rng, unsigned=False):
+    # a message as a dict, the format of to_dict() and of the runtime codecs
+    values = {}
+    for field in schema[1]:
+        name, kind = field[0], field[1]
+        if kind == "scalar":
+            values[name] = _random_builtin(field[2], rng, unsigned)
+        elif kind == "array":
+            values[name] = [_random_builtin(field[2], rng, unsigned) for _ in range(field[3])]
+        elif kind == "bitfield":
+            for member, _, mask, _ in field[3]:
+                values[member] = rng.randint(0, mask)
+        elif kind == "message":
+            values[name] = _random_values(field[2], rng, unsigned)
+        else:
+            values[name] = [_random_values(field[2], rng, unsigned) for _ in range(field[3])]
+    return values
+
+
+def _random_builtin(e_type, rng, unsigned):
+    if e_type in FLOAT_TYPES:
+        # quarters are exact in a float32, so every implementation keeps them unchanged
+        return 0.0 if unsigned else rng.randint(-4000, 4000) / 4
+    low = 0 if unsigned else BUILTINS[e_type]["min"]
+    return rng.randint(low, BUILTINS[e_type]["max"])
+
+
+def _messages(module, codecs, rng, unsigned=False):
+    for word_id, message in enumerate(module.REGISTRY.classes):
+        values = _random_values(codecs[word_id].schema, rng, unsigned)
+        yield word_id, values, message.from_dict(values)
+
+
+def test_sample_covers_both_message_array_layouts(codecs):
+    strip = codecs["strip"]
+    counts = {field[0]: field[3] * codecs[field[2][0]].members for field in strip.schema[1] if field[1] == "messages"}
+    assert counts["bulbs"] <= STRUCT_UNROLL_LIMIT < counts["points"]
+
+
+def test_struct_round_trip(generated, codecs):
+    rng = random.Random(1)
+    for _ in range(20):
+        for word_id, values, msg in _messages(generated["struct"], codecs, rng):
+            data = msg.serialize()
+            assert len(data) == msg.SIZE
+
+            buffer = bytearray(msg.SIZE + 3)
+            assert msg.serialize_into(buffer, 3) == msg.SIZE
+            assert bytes(buffer[3:]) == data
+
+            decoded = type(msg)()
+            assert decoded.deserialize_from(buffer, 3) == msg.SIZE
+            assert decoded.to_dict() == values
+            assert decoded.serialize() == data
+
+
+def test_struct_matches_bitstream(generated, codecs):
+    # the bitstream backend writes every builtin as an unsigned integer, so the
+    # values compared with it are non-negative integers
+    rng = random.Random(2)
+    bitstream = generated["bitstream"]
+    for _ in range(10):
+        for word_id, values, msg in _messages(generated["struct"], codecs, rng, unsigned=True):
+            data = msg.serialize()
+            other = bitstream.REGISTRY.classes[word_id].from_dict(values)
+            assert other.serialize() == data
+
+            decoded = bitstream.REGISTRY.classes[word_id]()
+            decoded.deserialize(data)
+            assert decoded.to_dict() == values
+
+
+def test_runtime_codecs_match_generated(generated, codecs, definitions):
+    rng = random.Random(3)
+    text = io.StringIO()
+    _tree(definitions).jsonPrint(text)
+    from_json = codecRegistry.from_json(text.getvalue())
+    for _ in range(20):
+        for word_id, values, msg in _messages(generated["struct"], codecs, rng):
+            data = msg.serialize()
+            codec = codecs[word_id]
+            assert codec.size == msg.SIZE
+            assert codec.encode(values) == data
+            assert codec.decode(data) == values
+            assert from_json[word_id].encode(values) == data
+
+            buffer = bytearray(codec.size + 2)
+            assert codec.encode_into(values, buffer, 2) == codec.size
+            assert bytes(buffer[2:]) == data
+
+
+def test_array_lengths_are_checked(generated, codecs):
+    strip = generated["struct"].SENSOR.strip()
+    strip.points.pop()
+    with pytest.raises(ValueError):
+        strip.serialize()
+
+    telemetry = generated["struct"].SENSOR.telemetry()
+    telemetry.samples.pop()
+    with pytest.raises(ValueError):
+        telemetry.serialize()
+
+    values = codecs["strip"].new()
+    values["points"].pop()
+    with pytest.raises(ValueError):
+        codecs["strip"].encode(values)
+
+
+def test_delta_round_trip(generated, codecs):
+    from serializer.serializer import deltaDecoder, deltaEncoder
+
+    rng = random.Random(4)
+    message = generated["struct"].SENSOR.strip
+    encoder = deltaEncoder(message, key_interval=5)
+    decoder = deltaDecoder(message)
+    msg = message()
+    for _ in range(30):
+        # change a few fields at a time so most deltas aren't key frames
+        msg.connected = rng.randint(0, 255)
+        msg.points[rng.randrange(len(msg.points))].x = rng.randint(-100, 100)
+        delta = encoder.encode(msg)
+        decoded, consumed = decoder.decode(delta)
+        assert consumed == len(delta)
+        assert decoded.serialize() == msg.serialize()
+
+
+def test_capture_round_trip(generated, codecs, tmp_path):
+    from serializer.parallel import count_capture, decode_capture
+    from serializer.serializer import captureReader
+
+    module = generated["struct"]
+    registry = module.REGISTRY
+    rng = random.Random(5)
+    messages = [msg for _ in range(50) for _, _, msg in _messages(module, codecs, rng)]
+    path = tmp_path / "capture.bin"
+    path.write_bytes(b"".join(registry.encode_frame(msg) for msg in messages))
+
+    with captureReader(str(path), registry) as capture:
+        assert [msg.serialize() for msg in capture.messages()] == [msg.serialize() for msg in messages]
+
+    counts = count_capture(str(path), registry, workers=2)
+    assert counts == [50] * len(registry)
+
+    word_id = module.wordIds.SENSOR__telemetry
+    records = decode_capture(str(path), registry, word_id, workers=2)
+    expected = b"".join(msg.serialize() for msg in messages if msg.WORD_ID == word_id)
+    assert records.tobytes() == expected
+
+
+def test_ctypes_bindings_leave_out_bitfields(definitions):
+    # the C++ serializers don't write bitfield groups, so messages holding them,
+    # directly or nested, get no native functions
+    generator = CtypesGenerator(_tree(definitions))
+    assert "bulb" not in generator.generate_shim("message")
+    namespace = {"__file__": "message_native.py"}
+    exec(generator.generate_module("message"), namespace)
+    ids = namespace["wordIds"]
+    for word_id in (ids.LIGHT__bulb, ids.SENSOR__strip):
+        assert namespace["DECODERS"][word_id] is None and namespace["DTYPES"][word_id] is None
+        with pytest.raises(ValueError):
+            namespace["decode"](word_id, bytes(namespace["SIZES"][word_id]))
+    for word_id in (ids.SENSOR__point, ids.SENSOR__telemetry):
+        assert namespace["DECODERS"][word_id] is not None and namespace["DTYPES"][word_id] is not None
+
+
+@pytest.mark.skipif(shutil.which("g++") is None, reason="needs g++ to build the C++ serializers")
+def test_cpp_matches_python(definitions, tmp_path):
+    # the C++ generator has no bitfield support, so both sides use the definitions without them
+    CtypesGenerator(_tree(definitions, bitfields=False)).generate_source_files(str(tmp_path / "cpp"), "message")
+    pythonGenerator(_tree(definitions, bitfields=False)).generate_source_files(str(tmp_path / "python"), "message")
+    native = _load(tmp_path / "cpp", "message_native", "message_native.py")
+    module = _load(tmp_path / "python", "message_plain")
+    codecs = codecRegistry.from_ast(_tree(definitions, bitfields=False))
+    rng = random.Random(6)
+    for word_id, message in enumerate(module.REGISTRY.classes):
+        data = b"".join(message.from_dict(_random_values(codecs[word_id].schema, rng)).serialize() for _ in range(10))
+        records = native.decode(word_id, data)
+        assert native.encode(word_id, records) == data
+        assert records.tobytes() == message.decode_batch(data).astype(native.DTYPES[word_id]).tobytes()